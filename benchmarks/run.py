@@ -0,0 +1,229 @@
+"""Benchmark the integration against the local API stand-in.
+
+For every contract count the real config entry setup, the sensor platform,
+contract refreshes and async_handle_fetch_best_contracts are driven in a
+test Home Assistant instance. Reported per phase: wall time, HTTP calls
+served by the stub, database operations and peak traced memory.
+
+--contracts sets the number of tracked sensors and database rows, --catalog
+the number of records the stub serves and so the /data payload size. By
+default the catalog holds just the tracked contracts; pass a fixed catalog
+to measure sensor count against a constant payload, or vary the catalog
+with one contract count to measure parsing cost on its own.
+
+    python -m benchmarks.run --contracts 10 100 1000 --latency 0.05
+    python -m benchmarks.run --contracts 10 --catalog 100 1000 10000
+"""
+
+import argparse
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+import json
+import logging
+from pathlib import Path
+import sys
+import tempfile
+import time
+import tracemalloc
+from unittest.mock import patch
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import homeassistant.core  # noqa: E402, F401  (must load before loader)
+from homeassistant import loader  # noqa: E402
+from pytest_homeassistant_custom_component.common import (  # noqa: E402
+    MockConfigEntry,
+    async_test_home_assistant,
+)
+
+from benchmarks.stub_server import StubConfig, StubServer  # noqa: E402
+from custom_components.sec_api_v2 import api as api_module  # noqa: E402
+from custom_components.sec_api_v2.const import DOMAIN  # noqa: E402
+from custom_components.sec_api_v2.db import async_get_db  # noqa: E402
+from custom_components.sec_api_v2.services import (  # noqa: E402
+    async_handle_fetch_best_contracts,
+)
+
+
+@dataclass
+class PhaseResult:
+    """Cost of one benchmark phase."""
+
+    contracts: int
+    catalog: int
+    phase: str
+    wall_ms: float
+    http_calls: int
+    db_operations: int
+    peak_memory_kb: float
+
+
+def _db_operations(db):
+    return sum(timing["count"] for timing in db.timings.as_dict().values())
+
+
+@asynccontextmanager
+async def measure(results, phase, server, db, runs=1):
+    """Record the cost of the body of an async with block, averaged over runs."""
+    server.stats.reset()
+    db_before = _db_operations(db) if db is not None else 0
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    yield
+    wall = (time.perf_counter() - start) * 1000
+    db_after = _db_operations(db) if db is not None else 0
+    results.append(
+        PhaseResult(
+            contracts=server.config.contracts,
+            catalog=len(server.records),
+            phase=phase,
+            wall_ms=round(wall / runs, 2),
+            http_calls=sum(server.stats.requests.values()) // runs,
+            db_operations=(db_after - db_before) // runs,
+            peak_memory_kb=round(tracemalloc.get_traced_memory()[1] / 1024, 1),
+        )
+    )
+
+
+async def _block_till_done(hass):
+    """Wait for pending work, including background tasks where supported."""
+    try:
+        await hass.async_block_till_done(wait_background_tasks=True)
+    except TypeError:
+        await hass.async_block_till_done()
+
+
+async def bench_contracts(contracts, catalog, args, results):
+    """Run all phases for one number of tracked contracts and catalog size."""
+    server = StubServer(
+        StubConfig(
+            contracts=contracts,
+            catalog=catalog,
+            latency=args.latency,
+            error_rate=args.error_rate,
+            payloads=args.payloads,
+        )
+    )
+    url = await server.start()
+    rows = [
+        (
+            record["energietype"],
+            record["vast_variabel_dynamisch"],
+            record["segment"],
+            record["handelsnaam"],
+            record["productnaam"],
+            record["prijsonderdeel"],
+            None,
+            None,
+        )
+        for record in server.tracked
+    ]
+
+    with tempfile.TemporaryDirectory() as config_dir, patch.object(
+        api_module, "API_BASE_URL", url
+    ):
+        async with async_test_home_assistant(storage_dir=config_dir) as hass:
+            hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+            entry = MockConfigEntry(
+                domain=DOMAIN,
+                data={"api_key": "benchmark", "zip_code": "2000"},
+                options=args.options,
+                entry_id="benchmark",
+            )
+            entry.add_to_hass(hass)
+            db = await async_get_db(hass)
+            await db.async_import_contracts(entry.entry_id, rows, [])
+
+            async with measure(results, "setup", server, db):
+                assert await hass.config_entries.async_setup(entry.entry_id)
+                await _block_till_done(hass)
+
+            data = hass.data[DOMAIN][entry.entry_id]
+            api = data["api"]
+            coordinator = data["coordinator"]
+
+            async with measure(results, "refresh", server, db, args.refreshes):
+                for _ in range(args.refreshes):
+                    # Cold cache, so every refresh reaches the API
+                    api.cache.clear()
+                    await coordinator.async_refresh()
+
+            async with measure(
+                results, "refresh_cached", server, db, args.refreshes
+            ):
+                for _ in range(args.refreshes):
+                    await coordinator.async_refresh()
+
+            async with measure(results, "fetch_best_contracts", server, db):
+                await async_handle_fetch_best_contracts(
+                    hass,
+                    entry,
+                    {
+                        "conf_top_energy_type": "",
+                        "conf_top_segment": "",
+                        "conf_top_contract_type": "",
+                        "conf_top_contracts_limit": 3,
+                    },
+                )
+
+            assert await hass.config_entries.async_unload(entry.entry_id)
+            await hass.async_block_till_done()
+
+    await server.stop()
+
+
+def print_table(results):
+    """Print the results as a table."""
+    columns = list(PhaseResult.__dataclass_fields__)
+    rows = [[str(value) for value in asdict(result).values()] for result in results]
+    widths = [
+        max(len(column), *(len(row[i]) for row in rows))
+        for i, column in enumerate(columns)
+    ]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)))
+
+
+async def main(args):
+    """Run the benchmark for every contract count and catalog size."""
+    tracemalloc.start()
+    results = []
+    for contracts in args.contracts:
+        for catalog in args.catalog or [None]:
+            await bench_contracts(contracts, catalog, args, results)
+    tracemalloc.stop()
+
+    if args.json:
+        print(json.dumps([asdict(result) for result in results], indent=2))
+    else:
+        print_table(results)
+
+
+def parse_args(argv=None):
+    """Parse the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--contracts", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument(
+        "--catalog", type=int, nargs="+", help="records served, default contracts"
+    )
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--refreshes", type=int, default=5)
+    parser.add_argument(
+        "--payloads", type=Path, help="directory with recorded month/data/constants.json"
+    )
+    parser.add_argument(
+        "--options", type=json.loads, default={}, help="config entry options as JSON"
+    )
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    # Silence the untested custom integration warning of every setup
+    logging.getLogger("homeassistant.loader").setLevel(logging.ERROR)
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,254 @@
+"""Local stand-in for the Smart Energy Control API.
+
+Serves /month, /data and /constants from recorded payloads, or from a
+synthetic catalog when none are given. Latency, error rate and the catalog
+size, which sets the size of every /data payload, are configurable, and
+every request is counted per endpoint.
+"""
+
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, field
+import json
+from pathlib import Path
+import random
+
+from aiohttp import web
+
+ENERGY_TYPES = ("Elektriciteit", "Gas")
+CONTRACT_TYPES = ("Dynamisch", "Variabel", "Vast")
+SEGMENTS = ("Woning", "Onderneming")
+PRICE_COMPONENTS = ("Enkelvoudig", "Tweevoudig dag", "Tweevoudig nacht")
+
+
+@dataclass
+class StubConfig:
+    """Behaviour of the stub server."""
+
+    contracts: int = 100
+    # Records served, at least contracts; larger catalogs grow /data payloads
+    catalog: int | None = None
+    latency: float = 0.05
+    jitter: float = 0.01
+    error_rate: float = 0.0
+    payloads: Path | None = None
+    seed: int = 1
+
+
+@dataclass
+class StubStats:
+    """Requests served by the stub."""
+
+    requests: Counter = field(default_factory=Counter)
+    errors: Counter = field(default_factory=Counter)
+    bytes: Counter = field(default_factory=Counter)
+
+    def reset(self):
+        """Forget all counted requests."""
+        self.requests.clear()
+        self.errors.clear()
+        self.bytes.clear()
+
+
+def synthetic_records(count, seed=1):
+    """Return count prijsonderdelen spread over all query dimensions."""
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        contract_type = CONTRACT_TYPES[i % len(CONTRACT_TYPES)]
+        current = round(rng.uniform(0.15, 0.45), 5)
+        record = {
+            "energietype": ENERGY_TYPES[(i // 6) % len(ENERGY_TYPES)],
+            "vast_variabel_dynamisch": contract_type,
+            "segment": SEGMENTS[(i // 3) % len(SEGMENTS)],
+            "handelsnaam": f"Supplier {i % 25}",
+            "productnaam": f"Product {i}",
+            "prijsonderdeel": PRICE_COMPONENTS[i % len(PRICE_COMPONENTS)],
+            "prices_afname": {
+                "current_price": current,
+                "today_avg_anchor_10kwh": round(current * rng.uniform(0.9, 1.1), 5),
+            },
+            "prices_injectie": {"current_price": round(current / 4, 5)},
+            "vaste_vergoeding": round(rng.uniform(20, 120), 2),
+        }
+        if contract_type == "Dynamisch":
+            prices = [round(current * rng.uniform(0.5, 1.5), 5) for _ in range(96)]
+            record["series_afname"] = {
+                "start": "2024-10-01T00:00:00+02:00",
+                "resolution": 15,
+                "values": prices,
+            }
+            record["series_injectie"] = {
+                "start": "2024-10-01T00:00:00+02:00",
+                "resolution": 15,
+                "values": [round(price / 4, 5) for price in prices],
+            }
+        records.append(record)
+    return records
+
+
+def _load(payloads, name):
+    """Return a recorded payload, if there is one."""
+    if payloads is None:
+        return None
+    path = payloads / f"{name}.json"
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _recorded_records(data, count):
+    """Return count prijsonderdelen from a recorded /data payload, repeated as needed."""
+    recorded = [
+        record
+        for contract in data.get("data", {}).values()
+        for record in contract.get("prijsonderdelen", [])
+    ]
+    if not recorded:
+        return []
+    records = []
+    for i in range(count):
+        record = dict(recorded[i % len(recorded)])
+        if i >= len(recorded):
+            # Copies get their own product so they stay distinct contracts
+            record["productnaam"] = f"{record.get('productnaam')} #{i // len(recorded)}"
+        records.append(record)
+    return records
+
+
+class StubServer:
+    """aiohttp application replaying the API on localhost."""
+
+    def __init__(self, config: StubConfig) -> None:
+        """Build the catalog the server answers from."""
+        self.config = config
+        self.stats = StubStats()
+        self._rng = random.Random(config.seed)
+        self._month = _load(config.payloads, "month") or {"jaar": "2024", "maand": "okt"}
+        self._constants = _load(config.payloads, "constants") or {
+            "postcode": "2000",
+            "distributie_kwh": 0.0712,
+            "transmissie_kwh": 0.0193,
+            "accijnzen_kwh": 0.0504,
+            "energiebijdrage_kwh": 0.0020,
+            "groene_stroom_kwh": 0.0118,
+            "wkk_kwh": 0.0037,
+            "capaciteitstarief": 49.34,
+            "databeheer": 17.85,
+        }
+        recorded = _load(config.payloads, "data")
+        size = max(config.catalog or 0, config.contracts)
+        self.records = (
+            _recorded_records(recorded, size)
+            if recorded is not None
+            else synthetic_records(size, config.seed)
+        )
+        self._runner = None
+        self.url = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Start serving, on a free port unless one is given."""
+        app = web.Application()
+        app.router.add_get("/month", self._handle_month)
+        app.router.add_get("/data", self._handle_data)
+        app.router.add_get("/constants", self._handle_constants)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self):
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _respond(self, request, payload):
+        """Answer after the configured latency, failing at the error rate."""
+        endpoint = request.path
+        self.stats.requests[endpoint] += 1
+        delay = self.config.latency + self._rng.uniform(0, self.config.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self._rng.random() < self.config.error_rate:
+            self.stats.errors[endpoint] += 1
+            return web.Response(status=503, text="Service unavailable")
+        body = json.dumps(payload).encode()
+        self.stats.bytes[endpoint] += len(body)
+        return web.Response(body=body, content_type="application/json")
+
+    @property
+    def tracked(self):
+        """Return the records a benchmark tracks as contract sensors."""
+        return self.records[: self.config.contracts]
+
+    async def _handle_month(self, request):
+        return await self._respond(request, self._month)
+
+    async def _handle_constants(self, request):
+        return await self._respond(request, self._constants)
+
+    async def _handle_data(self, request):
+        query = request.query
+        series = query.get("show_series") == "yes"
+        matching = [
+            record
+            for record in self.records
+            if all(
+                not query.get(name) or record.get(name) == query[name]
+                for name in ("energietype", "vast_variabel_dynamisch", "segment")
+            )
+        ]
+        if query.get("bottom", "").isdigit():
+            matching = sorted(
+                matching, key=lambda r: r["prices_afname"]["today_avg_anchor_10kwh"]
+            )[: int(query["bottom"])]
+
+        data = {}
+        for record in matching:
+            if not series:
+                record = {
+                    key: value
+                    for key, value in record.items()
+                    if key not in ("series_afname", "series_injectie")
+                }
+            contract = f"{record['handelsnaam']}|{record['productnaam']}"
+            data.setdefault(contract, {"prijsonderdelen": []})[
+                "prijsonderdelen"
+            ].append(record)
+        return await self._respond(request, {"data": data})
+
+
+async def _main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--contracts", type=int, default=100)
+    parser.add_argument("--catalog", type=int, help="records served, default contracts")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--payloads", type=Path)
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    server = StubServer(
+        StubConfig(
+            contracts=args.contracts,
+            catalog=args.catalog,
+            latency=args.latency,
+            error_rate=args.error_rate,
+            payloads=args.payloads,
+        )
+    )
+    print(f"Serving {len(server.records)} records on {await server.start(port=args.port)}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
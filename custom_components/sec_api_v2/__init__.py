@@ -1,16 +1,44 @@
 """Init file for sec-api-v2."""
 
+import asyncio
 import logging
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
-from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.core import HomeAssistant, SupportsResponse
+from homeassistant.exceptions import ConfigEntryNotReady, Unauthorized, UnknownUser
 
 from .api import SmartEnergyControlAPI
-from .const import API_KEY, DOMAIN
-from .db import initialize_db, remove_all_except_entry_id, set_db_path
-from .services import async_handle_generate_contracts, async_handle_fetch_best_contracts
+from .catalog import SecCatalogCache
+from .const import (
+    API_KEY,
+    CONF_CONNECT_TIMEOUT,
+    CONF_PRICE_SERIES,
+    CONF_REQUEST_TIMEOUT,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_PRICE_SERIES,
+    DEFAULT_REQUEST_TIMEOUT,
+    DOMAIN,
+)
+from .coordinator import SecDataCoordinator
+from .scheduler import SecRefreshScheduler, publication_window
+from .snapshot import SecSnapshot
+from .db import async_get_db
+from .services import (
+    FIND_CHEAPEST_WINDOW_SCHEMA,
+    GENERATE_CONTRACTS_SCHEMA,
+    GET_CONTRACT_DETAILS_SCHEMA,
+    GET_PRICE_FORECAST_SCHEMA,
+    PROFILE_SCHEMA,
+    SIMULATE_ANNUAL_COST_SCHEMA,
+    async_handle_fetch_best_contracts,
+    async_handle_find_cheapest_window,
+    async_handle_generate_contracts,
+    async_handle_get_contract_details,
+    async_handle_get_price_forecast,
+    async_handle_profile,
+    async_handle_simulate_annual_cost,
+)
 
 _LOGGER = logging.getLogger(__name__)
 PLATFORMS: list[Platform] = [Platform.SENSOR]
@@ -25,41 +53,178 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Set up Smart Energy Control from a config entry."""
     api_key = entry.data.get(API_KEY)
 
-    api = SmartEnergyControlAPI(api_key)
+    api = SmartEnergyControlAPI(
+        api_key,
+        request_timeout=entry.options.get(
+            CONF_REQUEST_TIMEOUT, DEFAULT_REQUEST_TIMEOUT
+        ),
+        connect_timeout=entry.options.get(
+            CONF_CONNECT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT
+        ),
+    )
+
+    snapshot = SecSnapshot(hass, entry.entry_id)
+    # Authentication runs while the local snapshot and database are loaded
+    auth = entry.async_create_background_task(
+        hass, api.async_confirm_period(), f"{DOMAIN} authenticate"
+    )
+    restored, _ = await asyncio.gather(
+        snapshot.async_load(), _async_clean_up_db(hass, entry.entry_id)
+    )
 
-    authenticated = await api.authenticate()
-    if not authenticated:
+    if restored and "period" in snapshot.restored:
+        # Start from the saved period, authentication finishes in the background
+        api.jaar, api.maand = snapshot.restored["period"]
+        auth.add_done_callback(_log_background_auth)
+    elif not await auth:
         _LOGGER.error("Failed to authenticate with the Smart Energy Control API")
+        await api.close()
         raise ConfigEntryNotReady
+    snapshot.async_track("period", lambda: [api.jaar, api.maand])
 
-    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = api
-    _LOGGER.info("Smart Energy Control setup complete")
-
-    set_db_path(hass)
-    initialize_db()
+    api.publication_window = publication_window(entry.options)
+    coordinator = SecDataCoordinator(hass, api, entry, snapshot)
+    restored_groups = coordinator.async_restore() if restored else []
+    scheduler = SecRefreshScheduler(hass, coordinator, entry.options)
 
-    remove_all_except_entry_id(entry.entry_id)  # Clean up database
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
+        "api": api,
+        "coordinator": coordinator,
+        "scheduler": scheduler,
+        "catalog": SecCatalogCache(api),
+        "snapshot": snapshot,
+    }
 
     async def handle_generate_contracts_service(call):
         await async_handle_generate_contracts(hass, entry, call)
 
+    async def handle_get_contract_details_service(call):
+        return await async_handle_get_contract_details(hass, entry, call)
+
+    async def handle_get_price_forecast_service(call):
+        return await async_handle_get_price_forecast(hass, entry, call)
+
+    async def handle_find_cheapest_window_service(call):
+        return await async_handle_find_cheapest_window(hass, entry, call)
+
+    async def handle_simulate_annual_cost_service(call):
+        return await async_handle_simulate_annual_cost(hass, entry, call)
+
+    async def handle_profile_service(call):
+        # Admin only, profiling affects the whole process and writes files
+        if call.context.user_id:
+            user = await hass.auth.async_get_user(call.context.user_id)
+            if user is None:
+                raise UnknownUser(context=call.context)
+            if not user.is_admin:
+                raise Unauthorized(context=call.context)
+        return await async_handle_profile(hass, entry, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        "generate_contracts",
+        handle_generate_contracts_service,
+        schema=GENERATE_CONTRACTS_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "get_contract_details",
+        handle_get_contract_details_service,
+        schema=GET_CONTRACT_DETAILS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "get_price_forecast",
+        handle_get_price_forecast_service,
+        schema=GET_PRICE_FORECAST_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "find_cheapest_window",
+        handle_find_cheapest_window_service,
+        schema=FIND_CHEAPEST_WINDOW_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "simulate_annual_cost",
+        handle_simulate_annual_cost_service,
+        schema=SIMULATE_ANNUAL_COST_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
     hass.services.async_register(
-        DOMAIN, "generate_contracts", handle_generate_contracts_service
+        DOMAIN,
+        "profile",
+        handle_profile_service,
+        schema=PROFILE_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
     )
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+    if restored_groups:
+        # Sensors show the snapshot, bring it up to date in the background
+        entry.async_create_background_task(
+            hass,
+            coordinator.async_refresh_groups(restored_groups),
+            f"{DOMAIN} snapshot refresh",
+        )
+
+    scheduler.async_start()
+    entry.async_on_unload(scheduler.async_stop)
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
+    _LOGGER.info("Smart Energy Control setup complete")
+
     return True
 
 
+async def _async_clean_up_db(hass: HomeAssistant, entry_id):
+    """Open the contracts database and drop the rows of other entries."""
+    db = await async_get_db(hass)
+    await db.async_remove_all_except_entry_id(entry_id)
+
+
+def _log_background_auth(task: asyncio.Task):
+    """Report a failed authentication that setup did not wait for."""
+    if not task.cancelled() and not task.result():
+        _LOGGER.warning(
+            "Failed to authenticate with the Smart Energy Control API, "
+            "serving the last saved data and retrying on the next refresh"
+        )
+
+
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry):
+    """Apply changed options to the running entry without a reload."""
+    data = hass.data[DOMAIN][entry.entry_id]
+    data["api"].publication_window = publication_window(entry.options)
+    data["api"].set_timeouts(
+        entry.options.get(CONF_REQUEST_TIMEOUT, DEFAULT_REQUEST_TIMEOUT),
+        entry.options.get(CONF_CONNECT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT),
+    )
+    data["scheduler"].async_update_options(entry.options)
+    # Rewrite the contract sensors with the configured attribute profile
+    data["coordinator"].async_update_listeners()
+    if entry.options.get(CONF_PRICE_SERIES, DEFAULT_PRICE_SERIES):
+        # Records are served from the cache, only due price series are fetched
+        await data["coordinator"].async_refresh_groups(data["coordinator"].groups)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        data = hass.data[DOMAIN].pop(entry.entry_id)
+        await data["api"].close()
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Delete the snapshot of a removed config entry."""
+    await SecSnapshot(hass, entry.entry_id).async_remove()
+
+
 async def async_track_state_removed_domain(hass: HomeAssistant, entry: ConfigEntry):
     """Listen for integration removal."""
     _LOGGER.info("Domain removed")
@@ -1,11 +1,43 @@
 """API class script."""
 
+import asyncio
+from contextlib import asynccontextmanager
 import logging
-from urllib.parse import urlencode
+import sys
+import time
+from urllib.parse import urlencode, urlsplit
 
 import aiohttp
 
-from .const import API_BASE_URL
+from homeassistant.util import dt as dt_util
+
+from .cache import CacheEntry, ResponseCache
+from .const import (
+    API_BASE_URL,
+    CONNECTION_LIMIT,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_REQUEST_TIMEOUT,
+    DNS_CACHE_TTL,
+    KEEPALIVE_TIMEOUT,
+    PUBLICATION_INTERVAL,
+    PUBLICATION_WINDOW_END,
+    PUBLICATION_WINDOW_START,
+    REQUEST_CONCURRENCY,
+    RETRY_AFTER_MAX,
+    RETRY_ATTEMPTS,
+    STREAM_CHUNK_SIZE,
+)
+from .resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RETRY_STATUSES,
+    backoff_delay,
+    retry_after,
+)
+from .schedule import next_price_change
+from .series import parse_price_series
+from .stream import PrijsonderdelenParser
+from .telemetry import RequestStats
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -25,8 +57,119 @@ MONTHS_MAP = {
 }
 
 
+def _intern(value):
+    """Intern strings, so repeated names share one object."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _intern_dict(values):
+    """Return a copy of a dict with interned keys and string values."""
+    if not values:
+        return {}
+    return {sys.intern(key): _intern(value) for key, value in values.items()}
+
+
+class PriceComponent:
+    """Compact, read-only record of one price component of a /data response.
+
+    Categorical strings are interned, so the same supplier, product and
+    energy type names are shared by every record and refresh. Records are
+    shared by reference between the cache, the coordinator and the sensors.
+    """
+
+    __slots__ = (
+        "energietype",
+        "vast_variabel_dynamisch",
+        "segment",
+        "handelsnaam",
+        "productnaam",
+        "prijsonderdeel",
+        "prices_afname",
+        "prices_injectie",
+        "extra",
+    )
+
+    FIELDS = __slots__[:-1]
+
+    def __init__(self, raw: dict) -> None:
+        """Build the record from a raw API dict."""
+        raw = dict(raw)
+        self.energietype = _intern(raw.pop("energietype", None))
+        self.vast_variabel_dynamisch = _intern(
+            raw.pop("vast_variabel_dynamisch", None)
+        )
+        self.segment = _intern(raw.pop("segment", None))
+        self.handelsnaam = _intern(raw.pop("handelsnaam", None))
+        self.productnaam = _intern(raw.pop("productnaam", None))
+        self.prijsonderdeel = _intern(raw.pop("prijsonderdeel", None))
+        self.prices_afname = _intern_dict(raw.pop("prices_afname", None))
+        self.prices_injectie = _intern_dict(raw.pop("prices_injectie", None))
+        self.extra = _intern_dict(raw)
+
+    def get(self, key, default=None):
+        """Return a field by its API name, like dict.get."""
+        if key in self.FIELDS:
+            return getattr(self, key)
+        return self.extra.get(key, default)
+
+    def __getitem__(self, key):
+        """Return a field by its API name."""
+        if key in self.FIELDS:
+            return getattr(self, key)
+        return self.extra[key]
+
+    def as_dict(self) -> dict:
+        """Return the record as a plain dict, sharing the nested price dicts."""
+        return {
+            **{field: getattr(self, field) for field in self.FIELDS},
+            **self.extra,
+        }
+
+    def as_row(self) -> list:
+        """Return the record as a compact list of its fields, extra last."""
+        return [*(getattr(self, field) for field in self.FIELDS), self.extra]
+
+    @classmethod
+    def from_row(cls, row):
+        """Build a record from a list made by as_row."""
+        return cls({**row[-1], **dict(zip(cls.FIELDS, row[:-1]))})
+
+
+def _path(url):
+    """Return the path and query of an API url, for log messages."""
+    parts = urlsplit(url)
+    return f"{parts.path}?{parts.query}" if parts.query else parts.path
+
+
+def _log_error(message, err):
+    """Log a request error, short-circuits only at debug as the breaker logs opening."""
+    level = logging.DEBUG if isinstance(err, CircuitOpenError) else logging.ERROR
+    _LOGGER.log(level, f"{message}: {err!r}")
+
+
+def _log_failure(url, response):
+    """Log an error response with its endpoint and reason."""
+    _LOGGER.error(
+        f"Failed to fetch {_path(url)}: {response.status} {response.reason or ''}".rstrip()
+    )
+
+
+def parse_prijsonderdelen(data):
+    """Return the flat list of 'prijsonderdelen' of a /data response as records."""
+    return [
+        PriceComponent(prijsonderdeel)
+        for contract_value in data.get("data", {}).values()
+        for prijsonderdeel in contract_value.get("prijsonderdelen", [])
+    ]
+
+
 class SmartEnergyControlAPI:
-    def __init__(self, api_key):
+    def __init__(
+        self,
+        api_key,
+        request_timeout=DEFAULT_REQUEST_TIMEOUT,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+    ):
         self.api_key = api_key
         self.headers = {
             "Authorization": self.api_key,
@@ -34,73 +177,332 @@ class SmartEnergyControlAPI:
         }
         self.jaar = None
         self.maand = None
+        # Whether jaar and maand came from the API rather than a saved snapshot
+        self.authenticated = False
+        self.set_timeouts(request_timeout, connect_timeout)
+        self._session = None
+        self._cache = ResponseCache()
+        self.publication_window = (
+            PUBLICATION_WINDOW_START,
+            PUBLICATION_WINDOW_END,
+            PUBLICATION_INTERVAL,
+        )
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._limiter = asyncio.Semaphore(REQUEST_CONCURRENCY)
+        self.breaker = CircuitBreaker()
+        self.retries = 0
+        self.requests = RequestStats()
+        self.inflight_hits = 0
+        self.inflight_misses = 0
+
+    @property
+    def cache(self):
+        """Return the response cache."""
+        return self._cache
+
+    def set_timeouts(self, request_timeout, connect_timeout):
+        """Set the total and connect timeout of the next requests in seconds."""
+        self._timeout = aiohttp.ClientTimeout(
+            total=request_timeout, connect=connect_timeout
+        )
+
+    def _get_session(self):
+        """Return the pooled session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=CONNECTION_LIMIT,
+                limit_per_host=CONNECTION_LIMIT,
+                ttl_dns_cache=DNS_CACHE_TTL,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, headers=self.headers, timeout=self._timeout
+            )
+        return self._session
+
+    async def close(self):
+        """Close the pooled session and its connections."""
+        # Shared requests outlive callers that gave up, stop them first
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @asynccontextmanager
+    async def _request(self, url, headers=None):
+        """GET an url, retrying transient failures, and yield the final response.
+
+        Connection errors, timeouts, 429 and 5xx responses are retried with
+        jittered exponential backoff or after the Retry-After delay. At most
+        REQUEST_CONCURRENCY requests are in flight, and while the circuit
+        breaker is open requests fail fast with CircuitOpenError. Only 2xx
+        and 304 responses close the breaker; 5xx, connection errors and
+        Retry-After waits count against it, other client errors leave it
+        alone. The last error status is yielded, the last exception raised.
+        """
+        session = self._get_session()
+        endpoint = urlsplit(url).path
+        attempt = 0
+        while True:
+            trial = self.breaker.before_request()
+            try:
+                async with self._limiter:
+                    start = time.perf_counter()
+                    try:
+                        response = await session.get(
+                            url, headers=headers, timeout=self._timeout
+                        )
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                        self.requests.record(
+                            endpoint,
+                            type(err).__name__,
+                            (time.perf_counter() - start) * 1000,
+                        )
+                        self.breaker.record_failure()
+                        if attempt >= RETRY_ATTEMPTS:
+                            raise
+                        delay = backoff_delay(attempt)
+                    else:
+                        self.requests.record(
+                            endpoint,
+                            response.status,
+                            (time.perf_counter() - start) * 1000,
+                            response.content_length,
+                        )
+                        status = response.status
+                        asked = None
+                        delay = None
+                        if status in RETRY_STATUSES:
+                            asked = retry_after(response)
+                            delay = (
+                                asked if asked is not None else backoff_delay(attempt)
+                            )
+                            if attempt >= RETRY_ATTEMPTS or delay > RETRY_AFTER_MAX:
+                                delay = None
+                        if 200 <= status < 300 or status == 304:
+                            self.breaker.record_success()
+                        elif status >= 500 or asked is not None:
+                            # On giving up leave the API alone as long as it asked
+                            self.breaker.record_failure(
+                                asked if delay is None else None
+                            )
+                        elif trial:
+                            # Client errors do not tell whether the API is up
+                            self.breaker.release_trial()
+                        if delay is not None:
+                            response.release()
+                        else:
+                            try:
+                                yield response
+                            finally:
+                                response.release()
+                            return
+            except BaseException:
+                # Cancelled or failed otherwise, the trial never got an outcome
+                if trial:
+                    self.breaker.release_trial()
+                raise
+
+            attempt += 1
+            self.retries += 1
+            _LOGGER.debug(
+                "Retrying %s in %.1f s (attempt %s)", _path(url), delay, attempt + 1
+            )
+            await asyncio.sleep(delay)
+
+    async def _get_json(self, url):
+        """GET an url over the pooled session and return the decoded JSON body."""
+        async with self._request(url) as response:
+            if response.status == 200:
+                return await response.json()
+            _log_failure(url, response)
+            return None
+
+    async def _single_flight(self, key, factory):
+        """Run factory once for concurrent callers sharing the same key.
+
+        Callers are shielded, so a cancelled caller does not cancel the request
+        the others are waiting on.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.inflight_hits += 1
+            return await asyncio.shield(task)
+
+        self.inflight_misses += 1
+        task = asyncio.ensure_future(factory())
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _get_cached_json(self, url, parse=None):
+        """GET an url, serving it from the response cache while fresh.
+
+        parse turns the decoded JSON into the value that gets cached, so
+        parsed records are shared by every caller until the entry expires.
+
+        Concurrent misses for the same url share one request. Stale entries
+        are revalidated with If-None-Match/If-Modified-Since and kept until
+        the next price change on a 304.
+        """
+        key = url if parse is None else f"{parse.__name__}:{url}"
+        entry = self._cache.get(key)
+        if entry is not None and entry.is_fresh(dt_util.now()):
+            self._cache.hits += 1
+            return entry.data
+
+        self._cache.misses += 1
+        return await self._single_flight(
+            key, lambda: self._revalidate(key, url, entry, parse)
+        )
+
+    async def _revalidate(self, key, url, entry, parse):
+        """Fetch an url, sending the validators of a stale cache entry."""
+        now = dt_util.now()
+        headers = entry.conditional_headers() if entry is not None else None
+        async with self._request(url, headers) as response:
+            if response.status == 304 and entry is not None:
+                self._cache.revalidated += 1
+                entry.expires = next_price_change(now, *self.publication_window)
+                return entry.data
+            if response.status == 200:
+                data = await response.json()
+                if parse is not None:
+                    data = parse(data)
+                self._cache.set(
+                    key,
+                    CacheEntry(
+                        data=data,
+                        expires=next_price_change(now, *self.publication_window),
+                        etag=response.headers.get("ETag"),
+                        last_modified=response.headers.get("Last-Modified"),
+                    ),
+                )
+                return data
+            _log_failure(url, response)
+            return None
 
     async def authenticate(self):
         """Authenticate the API key asynchronously by fetching the latest year and month."""
         url = f"{API_BASE_URL}/month"
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=self.headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        self.jaar = data.get("jaar")
-                        self.maand = data.get("maand")
-
-                        return True
-                    else:
-                        _LOGGER.error(f"Failed to authenticate: {response.status}")
-                        return False
-        except aiohttp.ClientError as e:
-            _LOGGER.error(f"Error during authentication: {e}")
+            async with self._request(url) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    self.jaar = data.get("jaar")
+                    self.maand = data.get("maand")
+                    self.authenticated = True
+
+                    return True
+                else:
+                    _LOGGER.error(f"Failed to authenticate: {response.status}")
+                    return False
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            _log_error("Error during authentication", e)
             return False
 
-    async def get_data(self, **params):
-        """Fetch data from the Smart Energy Control API asynchronously using the latest year and month."""
-        if params.get("jaar") in [None, "NULL"]:
+    async def async_ensure_authenticated(self):
+        """Authenticate once when the latest year and month are not known yet.
+
+        Concurrent callers share one request, so setup does not have to wait
+        for authentication before the first query.
+        """
+        if self.jaar is not None:
+            return True
+        return await self._single_flight("authenticate", self.authenticate)
+
+    async def async_confirm_period(self):
+        """Authenticate unless it already succeeded, sharing a running attempt.
+
+        Queries can run on a year and month restored from a snapshot; until
+        authentication succeeds it is retried on every call, so a newer
+        month is picked up once the API is reachable again.
+        """
+        if self.authenticated:
+            return True
+        return await self._single_flight("authenticate", self.authenticate)
+
+    def _data_url(self, params):
+        """Return the normalized /data url for a query, defaulting to the latest year and month."""
+        if params.get("jaar") is None:
             params["jaar"] = self.jaar
-        if params.get("maand") in [None, "NULL"]:
+        if params.get("maand") is None:
             params["maand"] = self.maand
         else:
             params["maand"] = MONTHS_MAP[params["maand"]]
-        url = f"{API_BASE_URL}/data?{urlencode(params)}"
-        # _LOGGER.info(url)
+        # Sorted so equal queries share one cache entry
+        return f"{API_BASE_URL}/data?{urlencode(sorted(params.items()))}"
+
+    async def get_data(self, **params):
+        """Fetch data from the Smart Energy Control API asynchronously using the latest year and month."""
+        await self.async_ensure_authenticated()
+        url = self._data_url(params)
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=self.headers) as response:
-                    if response.status == 200:
-                        # _LOGGER.info("Request finished")
-                        return await response.json()
-                    else:
-                        _LOGGER.error(f"Failed to fetch data: {response.status}")
-                        return None
-        except aiohttp.ClientError as e:
-            _LOGGER.error(f"Error fetching data: {e}")
+            return await self._get_cached_json(url)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            _log_error(f"Error fetching {_path(url)}", e)
             return None
 
     async def get_prijsonderdelen(self, **params):
-        """Fetch data and return a flat list of all 'prijsonderdelen'."""
-        data = await self.get_data(**params)
-        if data is None:
+        """Fetch data and return a flat list of all 'prijsonderdelen' as PriceComponent records.
+
+        The list and its records are shared with the cache and must not be
+        modified.
+        """
+        await self.async_ensure_authenticated()
+        url = self._data_url(params)
+        try:
+            return await self._get_cached_json(url, parse_prijsonderdelen)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            _log_error(f"Error fetching {_path(url)}", e)
+            return None
+
+    async def get_price_series(self, **params):
+        """Fetch the day-ahead price curves of a query per price component.
+
+        Returns (afname, injectie) PriceSeries pairs keyed like the
+        coordinator records. The result is shared with the cache and must not
+        be modified.
+        """
+        params["show_series"] = "yes"
+        await self.async_ensure_authenticated()
+        url = self._data_url(params)
+        try:
+            return await self._get_cached_json(url, parse_price_series)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            _log_error(f"Error fetching price series {_path(url)}", e)
             return None
-        prijsonderdelen_list = []
-        contracts_data = data.get("data", {})
-        for contract_value in contracts_data.values():
-            prijsonderdelen = contract_value.get("prijsonderdelen", [])
-            prijsonderdelen_list.extend(prijsonderdelen)
-        return prijsonderdelen_list
+
+    async def iter_prijsonderdelen(self, **params):
+        """Yield the 'prijsonderdelen' of a query as records while the response streams in.
+
+        The body is parsed incrementally and never held in full, which keeps
+        memory low for large "All" queries. Responses are not cached, and
+        network errors and error statuses are raised to the caller.
+        """
+        await self.async_ensure_authenticated()
+        url = self._data_url(params)
+        async with self._request(url) as response:
+            response.raise_for_status()
+            parser = PrijsonderdelenParser()
+            size = 0
+            async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                size += len(chunk)
+                for record in parser.feed(chunk):
+                    yield PriceComponent(record)
+            parser.close()
+            if response.content_length is None:
+                # Chunked bodies are only sized once streamed
+                self.requests.bytes[urlsplit(url).path] += size
 
     async def get_constants(self, zip_code):
         """Fetch data from the Smart Energy Control API asynchronously using the latest year and month."""
         url = f"{API_BASE_URL}/constants?postcode={zip_code}"
-        # _LOGGER.info(url)
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=self.headers) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    else:
-                        _LOGGER.error(f"Failed to fetch data: {response.status}")
-                        return None
-        except aiohttp.ClientError as e:
-            _LOGGER.error(f"Error fetching data: {e}")
+            return await self._get_json(url)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            _log_error(f"Error fetching {_path(url)}", e)
             return None
@@ -0,0 +1,65 @@
+"""Response cache for the API client."""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from .const import RESPONSE_CACHE_SIZE
+
+
+@dataclass
+class CacheEntry:
+    """A cached response and the validators to revalidate it."""
+
+    data: Any
+    expires: datetime
+    etag: str | None = None
+    last_modified: str | None = None
+
+    def is_fresh(self, now: datetime) -> bool:
+        """Return whether the entry can be served without revalidation."""
+        return now < self.expires
+
+    def conditional_headers(self) -> dict:
+        """Return the headers for a conditional request."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """LRU bounded cache of API responses keyed on the normalized request."""
+
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE) -> None:
+        """Initialize the cache."""
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+    def __len__(self) -> int:
+        """Return the number of cached responses."""
+        return len(self._entries)
+
+    def get(self, key: str) -> CacheEntry | None:
+        """Return the entry for a key, fresh or stale, and mark it recently used."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        """Store an entry, evicting the least recently used one when full."""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached responses."""
+        self._entries.clear()
@@ -0,0 +1,74 @@
+"""Catalog of suppliers, products and price components for the options flow."""
+
+from homeassistant.util import dt as dt_util
+
+from .schedule import next_price_change
+
+
+class SecCatalog:
+    """Supplier -> product -> price component index of one /data query."""
+
+    def __init__(self, prijsonderdelen) -> None:
+        """Build the index from a list of price components."""
+        self._index: dict[str, dict[str, set[str]]] = {}
+        for p in prijsonderdelen:
+            supplier = p.handelsnaam
+            product = p.productnaam
+            if not supplier:
+                continue
+            products = self._index.setdefault(supplier, {})
+            if not product:
+                continue
+            components = products.setdefault(product, set())
+            if p.prijsonderdeel:
+                components.add(p.prijsonderdeel)
+
+    def suppliers(self):
+        """Return the suppliers."""
+        return sorted(self._index)
+
+    def products(self, supplier):
+        """Return the products of a supplier."""
+        return sorted(self._index.get(supplier, {}))
+
+    def price_components(self, supplier, product):
+        """Return the price components of a product."""
+        return sorted(self._index.get(supplier, {}).get(product, ()))
+
+
+class SecCatalogCache:
+    """Catalogs per energy type, contract type, segment and period.
+
+    Shared by all options flows of an entry and kept until published prices
+    can next change.
+    """
+
+    def __init__(self, api) -> None:
+        """Initialize the cache."""
+        self._api = api
+        self._catalogs: dict[tuple, tuple[SecCatalog, object]] = {}
+
+    async def async_get(self, energy_type, contract_type, segment, jaar, maand):
+        """Return the catalog for a selection, fetching it when needed."""
+        key = (energy_type, contract_type, segment, jaar, maand)
+        now = dt_util.now()
+        cached = self._catalogs.get(key)
+        if cached is not None and now < cached[1]:
+            return cached[0]
+
+        prijsonderdelen = await self._api.get_prijsonderdelen(
+            jaar=jaar,
+            maand=maand,
+            energietype=energy_type,
+            vast_variabel_dynamisch=contract_type,
+            segment=segment,
+        )
+        if prijsonderdelen is None:
+            return None
+
+        catalog = SecCatalog(prijsonderdelen)
+        self._catalogs[key] = (
+            catalog,
+            next_price_change(now, *self._api.publication_window),
+        )
+        return catalog
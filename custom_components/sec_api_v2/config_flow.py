@@ -6,16 +6,31 @@ import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.core import callback
-
-from .const import DOMAIN
-from .db import (
-    add_contract,
-    add_custom_sensor,
-    get_contracts,
-    get_custom_sensors,
-    remove_contract,
-    remove_custom_sensor,
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+
+from .const import (
+    ATTRIBUTE_PROFILES,
+    CONF_ATTRIBUTE_PROFILE,
+    CONF_CONNECT_TIMEOUT,
+    CONF_MAX_JITTER,
+    CONF_PRICE_SERIES,
+    CONF_REQUEST_TIMEOUT,
+    CONF_SERIES_SLOTS,
+    CONF_WINDOW_END,
+    CONF_WINDOW_INTERVAL,
+    CONF_WINDOW_START,
+    DEFAULT_ATTRIBUTE_PROFILE,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_MAX_JITTER,
+    DEFAULT_PRICE_SERIES,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_SERIES_SLOTS,
+    DOMAIN,
+    SIGNAL_ENTITIES_CHANGED,
 )
+from .db import async_get_db
+from .ranking import DEFAULT_ANNUAL_CONSUMPTION, DEFAULT_METRIC, METRICS
+from .scheduler import publication_window
 from .services import async_handle_fetch_best_contracts
 
 _LOGGER = logging.getLogger(__name__)
@@ -64,6 +79,7 @@ class SecOptionsFlow(config_entries.OptionsFlow):
         self.supplier = None
         self.contract = None
         self.price_component = None
+        self._catalog = None
         self.jaar = None
         self.maand = None
 
@@ -86,6 +102,10 @@ class SecOptionsFlow(config_entries.OptionsFlow):
                 return await self.async_step_remove_custom_sensor()
             if action == "Configure top contracts":
                 return await self.async_step_configure_top_contracts()
+            if action == "Configure refresh schedule":
+                return await self.async_step_refresh_schedule()
+            if action == "Configure sensor attributes":
+                return await self.async_step_sensor_attributes()
 
         data_schema = vol.Schema(
             {
@@ -96,6 +116,8 @@ class SecOptionsFlow(config_entries.OptionsFlow):
                         "Remove contract",
                         "Remove custom sensor",
                         "Configure top contracts",
+                        "Configure refresh schedule",
+                        "Configure sensor attributes",
                     ]
                 ),
             }
@@ -178,36 +200,31 @@ class SecOptionsFlow(config_entries.OptionsFlow):
             # _LOGGER.debug(f"Selected Supplier: {self.supplier}")
             return await self.async_step_contract_selection()
 
-        api = self.hass.data[DOMAIN][self.config_entry.entry_id]
+        entry_data = self.hass.data[DOMAIN][self.config_entry.entry_id]
+        api = entry_data["api"]
 
-        if not await api.authenticate():
+        if api.jaar is None and not await api.authenticate():
             _LOGGER.error("API Authentication Failed")
             return self.async_abort(reason="api_data_error")
 
-        prijsonderdelen_list = await api.get_prijsonderdelen(
-            jaar=self.jaar,
-            maand=self.maand,
-            energietype=self.energy_type,
-            vast_variabel_dynamisch=self.vast_variabel_dynamisch,
-            segment=self.segment,
+        self._catalog = await entry_data["catalog"].async_get(
+            self.energy_type,
+            self.vast_variabel_dynamisch,
+            self.segment,
+            self.jaar,
+            self.maand,
         )
 
-        if prijsonderdelen_list is None:
+        if self._catalog is None:
             _LOGGER.error("No data returned from API for supplier selection")
             return self.async_abort(reason="api_data_error")
 
-        # _LOGGER.debug(f"Prijsonderdelen list received: {prijsonderdelen_list}")
-
-        filtered_suppliers = list(
-            {p.get("handelsnaam") for p in prijsonderdelen_list if p.get("handelsnaam")}
-        )
+        filtered_suppliers = self._catalog.suppliers()
 
         if not filtered_suppliers:
             _LOGGER.warning("No suppliers found with the selected filters")
             return self.async_abort(reason="no_suppliers_found")
 
-        # _LOGGER.debug(f"Filtered suppliers: {filtered_suppliers}")
-
         data_schema = vol.Schema(
             {vol.Required("selected_supplier"): vol.In(filtered_suppliers)}
         )
@@ -227,26 +244,7 @@ class SecOptionsFlow(config_entries.OptionsFlow):
             # _LOGGER.debug(f"Selected Contract: {self.contract}")
             return await self.async_step_price_component_selection()
 
-        api = self.hass.data[DOMAIN][self.config_entry.entry_id]
-
-        prijsonderdelen_list = await api.get_prijsonderdelen(
-            jaar=self.jaar,
-            maand=self.maand,
-            energietype=self.energy_type,
-            vast_variabel_dynamisch=self.vast_variabel_dynamisch,
-            segment=self.segment,
-            handelsnaam=self.supplier,
-        )
-
-        if prijsonderdelen_list is None:
-            _LOGGER.error("No data returned from API for contract selection")
-            return self.async_abort(reason="api_data_error")
-
-        # _LOGGER.debug(f"Prijsonderdelen list received: {prijsonderdelen_list}")
-
-        filtered_contracts = list(
-            {p.get("productnaam") for p in prijsonderdelen_list if p.get("productnaam")}
-        )
+        filtered_contracts = self._catalog.products(self.supplier)
 
         if not filtered_contracts:
             _LOGGER.warning("No contracts found for the selected supplier")
@@ -269,7 +267,8 @@ class SecOptionsFlow(config_entries.OptionsFlow):
     async def async_step_price_component_selection(self, user_input=None):
         """Handle the selection of a price component."""
         if user_input is not None:
-            add_contract(
+            db = await async_get_db(self.hass)
+            await db.async_add_contract(
                 self.config_entry.entry_id,
                 self.energy_type,
                 self.vast_variabel_dynamisch,
@@ -281,34 +280,16 @@ class SecOptionsFlow(config_entries.OptionsFlow):
                 self.jaar,
             )
 
-            await self.hass.config_entries.async_reload(self.config_entry.entry_id)
-
-            return self.async_create_entry(title="Contract Added", data=None)
-
-        api = self.hass.data[DOMAIN][self.config_entry.entry_id]
-
-        prijsonderdelen_list = await api.get_prijsonderdelen(
-            jaar=self.jaar,
-            maand=self.maand,
-            energietype=self.energy_type,
-            vast_variabel_dynamisch=self.vast_variabel_dynamisch,
-            segment=self.segment,
-            handelsnaam=self.supplier,
-            productnaam=self.contract,
-        )
-
-        if prijsonderdelen_list is None:
-            _LOGGER.error("No data returned from API for price component selection")
-            return self.async_abort(reason="api_data_error")
+            async_dispatcher_send(
+                self.hass, SIGNAL_ENTITIES_CHANGED.format(self.config_entry.entry_id)
+            )
 
-        # _LOGGER.debug(f"Prijsonderdelen list received: {prijsonderdelen_list}")
+            return self.async_create_entry(
+                title="Contract Added", data=dict(self.config_entry.options)
+            )
 
-        filtered_price_components = list(
-            {
-                p.get("prijsonderdeel")
-                for p in prijsonderdelen_list
-                if p.get("prijsonderdeel")
-            }
+        filtered_price_components = self._catalog.price_components(
+            self.supplier, self.contract
         )
 
         if not filtered_price_components:
@@ -333,27 +314,32 @@ class SecOptionsFlow(config_entries.OptionsFlow):
 
     async def async_step_assign_custom_name(self, user_input=None):
         """Assign a custom name to a sensor."""
+        db = await async_get_db(self.hass)
+
         if user_input is not None:
             custom_name = user_input["custom_sensor_name"]
             if user_input["use_prefix"]:
                 custom_name = f"{user_input['prefix']}{custom_name}"
 
-            add_custom_sensor(
+            await db.async_add_custom_sensor(
                 self.config_entry.entry_id,
                 user_input["sensor_id"],
                 custom_name,
             )
 
-            await self.hass.config_entries.async_reload(self.config_entry.entry_id)
+            async_dispatcher_send(
+                self.hass, SIGNAL_ENTITIES_CHANGED.format(self.config_entry.entry_id)
+            )
 
             return self.async_create_entry(
                 title=f"Created sensor.{custom_name}\nCreated sensor.{custom_name}_afname\nCreated sensor.{custom_name}_injectie",
-                data={},
+                data=dict(self.config_entry.options),
             )
 
         sensor_options = {
             sensor[10]: sensor[10].strip("sensor.sec_").replace("_", " ").title()
-            for sensor in get_contracts(self.config_entry.entry_id)
+            for sensor in await db.async_get_contracts(self.config_entry.entry_id)
+            if sensor[10]
         }
 
         data_schema = vol.Schema(
@@ -375,19 +361,24 @@ class SecOptionsFlow(config_entries.OptionsFlow):
 
     async def async_step_remove_contract(self, user_input=None):
         """Remove an existing contract sensor."""
+        db = await async_get_db(self.hass)
+
         if user_input is not None:
-            remove_contract(user_input["sensor_id"])
+            await db.async_remove_contract(user_input["sensor_id"])
 
-            await self.hass.config_entries.async_reload(self.config_entry.entry_id)
+            async_dispatcher_send(
+                self.hass, SIGNAL_ENTITIES_CHANGED.format(self.config_entry.entry_id)
+            )
 
             return self.async_create_entry(
                 title="Removed contract",
-                data={},
+                data=dict(self.config_entry.options),
             )
 
         sensor_options = {
             sensor[10]: sensor[10].strip("sensor.sec_").replace("_", " ").title()
-            for sensor in get_contracts(self.config_entry.entry_id)
+            for sensor in await db.async_get_contracts(self.config_entry.entry_id)
+            if sensor[10]
         }
 
         data_schema = vol.Schema(
@@ -404,19 +395,23 @@ class SecOptionsFlow(config_entries.OptionsFlow):
 
     async def async_step_remove_custom_sensor(self, user_input=None):
         """Remove an existing custom sensor."""
+        db = await async_get_db(self.hass)
+
         if user_input is not None:
-            remove_custom_sensor(user_input["sensor_name"])
+            await db.async_remove_custom_sensor(user_input["sensor_name"])
 
-            await self.hass.config_entries.async_reload(self.config_entry.entry_id)
+            async_dispatcher_send(
+                self.hass, SIGNAL_ENTITIES_CHANGED.format(self.config_entry.entry_id)
+            )
 
             return self.async_create_entry(
                 title="Removed contract",
-                data={},
+                data=dict(self.config_entry.options),
             )
 
         sensor_options = {
             sensor[3]: sensor[3].strip("sensor.sec_").replace("_", " ").title()
-            for sensor in get_custom_sensors(self.config_entry.entry_id)
+            for sensor in await db.async_get_custom_sensors(self.config_entry.entry_id)
         }
 
         data_schema = vol.Schema(
@@ -449,13 +444,21 @@ class SecOptionsFlow(config_entries.OptionsFlow):
                 "conf_top_segment": self.conf_top_segment,
                 "conf_top_contract_type": self.conf_top_vast_variabel_dynamisch,
                 "conf_top_contracts_limit": self.conf_top_contracts_limit,
+                "conf_top_metric": user_input["conf_top_metric"],
+                "conf_top_annual_consumption": user_input[
+                    "conf_top_annual_consumption"
+                ],
             }
 
             await async_handle_fetch_best_contracts(self.hass, self.config_entry, data)
 
-            await self.hass.config_entries.async_reload(self.config_entry.entry_id)
+            async_dispatcher_send(
+                self.hass, SIGNAL_ENTITIES_CHANGED.format(self.config_entry.entry_id)
+            )
 
-            return self.async_create_entry(title="Top Contracts Configured", data={})
+            return self.async_create_entry(
+                title="Top Contracts Configured", data=dict(self.config_entry.options)
+            )
 
         data_schema = vol.Schema(
             {
@@ -468,7 +471,15 @@ class SecOptionsFlow(config_entries.OptionsFlow):
                 vol.Required("conf_top_contract_type", default="Dynamisch"): vol.In(
                     ["Dynamisch", "Variabel", "Vast", "All"]
                 ),
-                vol.Required("conf_top_contracts_limit", default=3): vol.Coerce(int),
+                vol.Required("conf_top_contracts_limit", default=3): vol.All(
+                    vol.Coerce(int), vol.Range(min=1)
+                ),
+                vol.Required("conf_top_metric", default=DEFAULT_METRIC): vol.In(
+                    list(METRICS)
+                ),
+                vol.Required(
+                    "conf_top_annual_consumption", default=DEFAULT_ANNUAL_CONSUMPTION
+                ): vol.All(vol.Coerce(int), vol.Range(min=0)),
                 vol.Optional("configure_top_contracts", default=True): bool,
             }
         )
@@ -480,3 +491,86 @@ class SecOptionsFlow(config_entries.OptionsFlow):
                 "description": "Configure top contracts filter and limit"
             },
         )
+
+    async def async_step_refresh_schedule(self, user_input=None):
+        """Configure the price publication window, refresh jitter and timeouts."""
+        errors = {}
+        options = {**self.config_entry.options, **(user_input or {})}
+        if user_input is not None:
+            if user_input[CONF_WINDOW_START] >= user_input[CONF_WINDOW_END]:
+                errors["base"] = "invalid_publication_window"
+            else:
+                return self.async_create_entry(
+                    title="Refresh schedule configured", data=options
+                )
+
+        start, end, interval = publication_window(options)
+        data_schema = vol.Schema(
+            {
+                vol.Required(CONF_WINDOW_START, default=start): vol.All(
+                    vol.Coerce(int), vol.Range(min=0, max=23)
+                ),
+                vol.Required(CONF_WINDOW_END, default=end): vol.All(
+                    vol.Coerce(int), vol.Range(min=1, max=24)
+                ),
+                vol.Required(CONF_WINDOW_INTERVAL, default=interval): vol.All(
+                    vol.Coerce(int), vol.Range(min=1, max=60)
+                ),
+                vol.Required(
+                    CONF_MAX_JITTER,
+                    default=options.get(CONF_MAX_JITTER, DEFAULT_MAX_JITTER),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=300)),
+                vol.Required(
+                    CONF_REQUEST_TIMEOUT,
+                    default=options.get(CONF_REQUEST_TIMEOUT, DEFAULT_REQUEST_TIMEOUT),
+                ): vol.All(vol.Coerce(int), vol.Range(min=5, max=300)),
+                vol.Required(
+                    CONF_CONNECT_TIMEOUT,
+                    default=options.get(CONF_CONNECT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=60)),
+            }
+        )
+
+        return self.async_show_form(
+            step_id="refresh_schedule",
+            data_schema=data_schema,
+            errors=errors,
+            description_placeholders={},
+        )
+
+    async def async_step_sensor_attributes(self, user_input=None):
+        """Configure which attributes the contract sensors expose."""
+        if user_input is not None:
+            return self.async_create_entry(
+                title="Sensor attributes configured",
+                data={**self.config_entry.options, **user_input},
+            )
+
+        data_schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_ATTRIBUTE_PROFILE,
+                    default=self.config_entry.options.get(
+                        CONF_ATTRIBUTE_PROFILE, DEFAULT_ATTRIBUTE_PROFILE
+                    ),
+                ): vol.In(ATTRIBUTE_PROFILES),
+                vol.Required(
+                    CONF_PRICE_SERIES,
+                    default=self.config_entry.options.get(
+                        CONF_PRICE_SERIES, DEFAULT_PRICE_SERIES
+                    ),
+                ): bool,
+                vol.Required(
+                    CONF_SERIES_SLOTS,
+                    default=self.config_entry.options.get(
+                        CONF_SERIES_SLOTS, DEFAULT_SERIES_SLOTS
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=24)),
+            }
+        )
+
+        return self.async_show_form(
+            step_id="sensor_attributes",
+            data_schema=data_schema,
+            description_placeholders={},
+        )
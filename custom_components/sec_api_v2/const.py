@@ -4,3 +4,53 @@ DOMAIN = "sec_api_v2"
 API_KEY = "api_key"
 ZIP_CODE = "zip_code"
 API_BASE_URL = "https://api.smartenergycontrol.be"
+
+CONF_REQUEST_TIMEOUT = "request_timeout"
+CONF_CONNECT_TIMEOUT = "connect_timeout"
+DEFAULT_REQUEST_TIMEOUT = 30
+DEFAULT_CONNECT_TIMEOUT = 10
+CONNECTION_LIMIT = 10
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 60
+REQUEST_CONCURRENCY = 4
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF_BASE = 1
+RETRY_BACKOFF_MAX = 30
+RETRY_AFTER_MAX = 60
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 30
+BREAKER_RESET_MAX = 600
+
+PUBLICATION_WINDOW_START = 12
+PUBLICATION_WINDOW_END = 14
+PUBLICATION_INTERVAL = 10
+RESPONSE_CACHE_SIZE = 128
+
+SIGNAL_ENTITIES_CHANGED = f"{DOMAIN}_entities_changed_{{}}"
+
+CONF_WINDOW_START = "publication_window_start"
+CONF_WINDOW_END = "publication_window_end"
+CONF_WINDOW_INTERVAL = "publication_interval"
+CONF_MAX_JITTER = "max_jitter"
+DEFAULT_MAX_JITTER = 30
+STREAM_CHUNK_SIZE = 64 * 1024
+
+CONF_ATTRIBUTE_PROFILE = "attribute_profile"
+ATTRIBUTE_PROFILE_MINIMAL = "minimal"
+ATTRIBUTE_PROFILE_PRICES = "prices"
+ATTRIBUTE_PROFILE_FULL = "full"
+ATTRIBUTE_PROFILES = [
+    ATTRIBUTE_PROFILE_MINIMAL,
+    ATTRIBUTE_PROFILE_PRICES,
+    ATTRIBUTE_PROFILE_FULL,
+]
+DEFAULT_ATTRIBUTE_PROFILE = ATTRIBUTE_PROFILE_PRICES
+UNRECORDED_ATTRIBUTES = frozenset(
+    {"prices_afname", "prices_injectie", "details", "upcoming_prices"}
+)
+
+CONTRACT_TYPE_DYNAMIC = "Dynamisch"
+CONF_PRICE_SERIES = "price_series"
+CONF_SERIES_SLOTS = "series_slots"
+DEFAULT_PRICE_SERIES = False
+DEFAULT_SERIES_SLOTS = 4
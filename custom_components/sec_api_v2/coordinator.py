@@ -0,0 +1,293 @@
+"""Shared data coordinator for contract sensors."""
+
+import asyncio
+from datetime import timedelta
+import logging
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CONF_PRICE_SERIES,
+    CONTRACT_TYPE_DYNAMIC,
+    DEFAULT_PRICE_SERIES,
+    DOMAIN,
+)
+from .api import PriceComponent
+from .series import PriceSeries, series_end
+from .telemetry import Timings
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def group_key(energy_type, contract_type, segment, month, year):
+    """Return the /data query dimensions a contract is fetched with."""
+    return (energy_type, contract_type, segment, month, year)
+
+
+def record_key(supplier, contract_name, price_component):
+    """Return the key of a price component within its group."""
+    return (supplier, contract_name, price_component)
+
+
+class SecDataCoordinator(DataUpdateCoordinator):
+    """Fetch the price components of all tracked contracts of a config entry.
+
+    Contracts are grouped by the dimensions the /data endpoint filters on, so a
+    refresh costs one request per distinct group instead of one per sensor.
+    Periodic refreshes are driven per group by SecRefreshScheduler.
+
+    In series mode the day-ahead price curves of dynamic groups are fetched
+    alongside, but only until tomorrow's prices are in.
+
+    Fetched groups are saved to the entry snapshot. Restored groups serve the
+    sensors right away and stay marked stale until a refresh succeeds, as do
+    groups whose last refresh failed.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, api, config_entry: ConfigEntry, snapshot=None
+    ) -> None:
+        """Initialize the coordinator."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} contracts",
+            update_interval=None,
+        )
+        self._api = api
+        self._entry = config_entry
+        self._groups: dict[tuple, dict[tuple, int]] = {}
+        self._series: dict[tuple, tuple] = {}
+        self._fetched_at: dict[tuple, str] = {}
+        self._stale: set[tuple] = set()
+        self._snapshot = snapshot
+        self.state_writes = 0
+        self.suppressed_writes = 0
+        self.refreshes = Timings()
+        if snapshot is not None:
+            snapshot.async_track("groups", self._encode_groups)
+
+    @callback
+    def async_restore(self):
+        """Serve the groups of the snapshot until they are refreshed."""
+        data = {}
+        for saved in self._snapshot.restored.get("groups", []):
+            group = tuple(saved["group"])
+            data[group] = {
+                record_key(p.handelsnaam, p.productnaam, p.prijsonderdeel): p
+                for p in map(PriceComponent.from_row, saved["records"])
+            }
+            self._fetched_at[group] = saved["fetched_at"]
+            if saved.get("series") is not None:
+                pairs = {
+                    tuple(key): (
+                        PriceSeries.from_raw(afname),
+                        PriceSeries.from_raw(injectie),
+                    )
+                    for key, afname, injectie in saved["series"]
+                }
+                self._series[group] = (series_end(pairs), pairs)
+        if data:
+            self._stale.update(data)
+            self.async_set_updated_data(data)
+        return list(data)
+
+    def _encode_groups(self):
+        """Return the tracked groups in the snapshot format."""
+        encoded = []
+        for group, records in (self.data or {}).items():
+            if group not in self._groups:
+                continue
+            series = self._series.get(group)
+            encoded.append(
+                {
+                    "group": list(group),
+                    "fetched_at": self._fetched_at.get(group),
+                    "records": [record.as_row() for record in records.values()],
+                    "series": None
+                    if series is None
+                    else [
+                        [
+                            list(key),
+                            afname.as_raw() if afname else None,
+                            injectie.as_raw() if injectie else None,
+                        ]
+                        for key, (afname, injectie) in series[1].items()
+                    ],
+                }
+            )
+        return encoded
+
+    @property
+    def stale_groups(self):
+        """Return the groups served from old data."""
+        return list(self._stale)
+
+    def staleness(self, group):
+        """Return when a stale group was last fetched, None when it is fresh."""
+        if group not in self._stale:
+            return None
+        return self._fetched_at.get(group)
+
+    @property
+    def groups(self):
+        """Return the groups currently fetched on refresh."""
+        return list(self._groups)
+
+    @callback
+    def async_track_contract(self, group, key):
+        """Start fetching the group a contract sensor belongs to."""
+        keys = self._groups.setdefault(group, {})
+        keys[key] = keys.get(key, 0) + 1
+
+    @callback
+    def async_untrack_contract(self, group, key):
+        """Stop fetching a group once its last contract sensor is gone."""
+        keys = self._groups.get(group)
+        if keys is None or key not in keys:
+            return
+        keys[key] -= 1
+        if keys[key] <= 0:
+            del keys[key]
+        if not keys:
+            del self._groups[group]
+            self._series.pop(group, None)
+            self._fetched_at.pop(group, None)
+            self._stale.discard(group)
+
+    def has_missing_groups(self):
+        """Return whether a tracked group has not been fetched yet."""
+        return any(group not in (self.data or {}) for group in self._groups)
+
+    def get_record(self, group, key):
+        """Return the latest record for a contract, if any."""
+        if not self.data:
+            return None
+        return self.data.get(group, {}).get(key)
+
+    def get_series(self, group, key):
+        """Return the (afname, injectie) price series of a contract, if any."""
+        series = self._series.get(group)
+        if series is None:
+            return None
+        return series[1].get(key)
+
+    def _group_params(self, group):
+        """Return the /data query parameters of a group."""
+        energy_type, contract_type, segment, month, year = group
+        return {
+            "maand": month,
+            "jaar": year,
+            "energietype": energy_type,
+            "vast_variabel_dynamisch": contract_type,
+            "segment": segment,
+            "postcode": self._entry.data.get("zip_code", "2000"),
+        }
+
+    def _series_due(self, group, now):
+        """Return whether the price series of a group must be (re)fetched.
+
+        A fetched curve is kept until it runs out, or until the publication
+        window opens and it does not cover tomorrow yet.
+        """
+        if group[1] != CONTRACT_TYPE_DYNAMIC:
+            return False
+        series = self._series.get(group)
+        if series is None:
+            return True
+        end = series[0]
+        if end is None or end <= now:
+            return True
+        window_start = self._api.publication_window[0]
+        day_after_tomorrow = dt_util.start_of_local_day(
+            now.date() + timedelta(days=2)
+        )
+        return now.hour >= window_start and end < day_after_tomorrow
+
+    async def _async_fetch_series(self, groups):
+        """Fetch the price series of the groups that are due."""
+        if not self._entry.options.get(CONF_PRICE_SERIES, DEFAULT_PRICE_SERIES):
+            self._series.clear()
+            return
+
+        now = dt_util.now()
+        groups = [group for group in groups if self._series_due(group, now)]
+        results = await asyncio.gather(
+            *(
+                self._api.get_price_series(**self._group_params(group))
+                for group in groups
+            )
+        )
+        for group, series in zip(groups, results):
+            if series is not None:
+                self._series[group] = (series_end(series), series)
+
+    async def _async_fetch_group(self, group):
+        """Fetch and index all price components of one group."""
+        prijsonderdelen = await self._api.get_prijsonderdelen(
+            **self._group_params(group), show_prices="yes"
+        )
+        if prijsonderdelen is None:
+            return None
+
+        return {
+            record_key(p.handelsnaam, p.productnaam, p.prijsonderdeel): p
+            for p in prijsonderdelen
+        }
+
+    async def _async_fetch_groups(self, groups, previous):
+        """Fetch groups into a copy of previous, keeping their old records on failure."""
+        # Retries authentication after a warm start whose attempt failed
+        await self._api.async_confirm_period()
+        with self.refreshes.measure("refresh"):
+            results, _ = await asyncio.gather(
+                asyncio.gather(*(self._async_fetch_group(group) for group in groups)),
+                self._async_fetch_series(groups),
+            )
+
+        data = dict(previous)
+        failed = 0
+        fetched_at = dt_util.utcnow().isoformat()
+        for group, records in zip(groups, results):
+            if records is None:
+                failed += 1
+                if group in data:
+                    self._stale.add(group)
+                continue
+            data[group] = records
+            self._fetched_at[group] = fetched_at
+            self._stale.discard(group)
+
+        if failed < len(groups) and self._snapshot is not None:
+            self._snapshot.async_schedule_save()
+        if failed:
+            _LOGGER.warning(
+                "Failed to refresh %s of %s contract groups", failed, len(groups)
+            )
+        return data, failed
+
+    async def async_refresh_groups(self, groups):
+        """Refresh some of the tracked groups and notify the sensors."""
+        groups = [group for group in groups if group in self._groups]
+        if not groups:
+            return
+        data, _ = await self._async_fetch_groups(groups, self.data or {})
+        self.async_set_updated_data(data)
+
+    async def _async_update_data(self):
+        """Fetch every tracked group, keeping the previous records on failure."""
+        groups = list(self._groups)
+        previous = {
+            group: records
+            for group, records in (self.data or {}).items()
+            if group in self._groups
+        }
+        data, failed = await self._async_fetch_groups(groups, previous)
+
+        if groups and failed == len(groups) and not previous:
+            raise UpdateFailed("No contract data available")
+
+        return data
@@ -1,327 +1,428 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import logging
 import os
 import re
 import sqlite3
+import sys
 
-_LOGGER = logging.getLogger(__name__)
-
-DB_PATH = None
-
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
 
-def set_db_path(hass):
-    """Set the database path based on the Home Assistant configuration directory."""
-    global DB_PATH
-    DB_PATH = hass.config.path("sec_contracts.db")
+from .const import DOMAIN
+from .telemetry import Timings
 
+_LOGGER = logging.getLogger(__name__)
 
-def initialize_db():
-    """Initialize the contracts database and create tables if not exists."""
-
-    db_dir = os.path.dirname(DB_PATH)
-    if not os.path.exists(db_dir):
-        os.makedirs(db_dir)
-
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+DATA_DB = f"{DOMAIN}_db"
+DB_FILENAME = "sec_contracts.db"
+CACHED_STATEMENTS = 64
 
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS contracts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            entry_id TEXT NOT NULL,
-            energy_type TEXT NOT NULL,
-            contract_type TEXT NOT NULL,
-            segment TEXT NOT NULL,
-            supplier TEXT NOT NULL,
-            contract_name TEXT NOT NULL,
-            price_component TEXT NOT NULL,
-            month TEXT NULL,
-            year TEXT NULL,
-            sensor_id TEXT NULL,
-            UNIQUE(energy_type, contract_type, segment, supplier, contract_name, price_component, month, year)
-        )
-    """)
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS top_contracts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            entry_id TEXT NOT NULL,
-            energy_type TEXT NOT NULL,
-            contract_type TEXT NOT NULL,
-            segment TEXT NOT NULL,
-            supplier TEXT NOT NULL,
-            contract_name TEXT NOT NULL,
-            price_component TEXT NOT NULL,
-            month TEXT NULL,
-            year TEXT NULL,
-            ranking TEXT NOT NULL,
-            UNIQUE(ranking)
-        )
-    """)
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS custom_sensors (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            entry_id TEXT NOT NULL,
-            original_sensor_id TEXT NOT NULL,
-            custom_sensor_name TEXT NOT NULL,
-            UNIQUE(custom_sensor_name)
-        )
-    """)
-
-    conn.commit()
-    conn.close()
-
-
-def add_contract(
-    entry_id,
-    energy_type,
-    contract_type,
-    segment,
-    supplier,
-    contract_name,
-    price_component,
-    month=None,
-    year=None,
-):
-    """Add a new contract to the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    try:
-        cursor.execute(
+# Ordered schema migrations, each applied once in its own transaction.
+MIGRATIONS = (
+    (
+        1,
+        (
             """
-            INSERT INTO contracts (entry_id, energy_type, contract_type, segment, supplier, contract_name, price_component, month, year, sensor_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-            (
-                entry_id,
-                energy_type,
-                contract_type,
-                segment,
-                supplier,
-                contract_name,
-                price_component,
-                month if month is not None else "NULL",
-                year if year is not None else "NULL",
-                "NULL",
-            ),
-        )
-
-        conn.commit()
-    except sqlite3.IntegrityError:
-        pass
-
-    conn.close()
-
-
-def add_custom_sensor(entry_id, original_sensor_id, custom_sensor_name):
-    """Insert or update a custom sensor mapping in the database based on custom_sensor_name."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        UPDATE custom_sensors
-        SET entry_id = ?, original_sensor_id = ?
-        WHERE custom_sensor_name = ?
-    """,
-        (entry_id, original_sensor_id, custom_sensor_name),
-    )
-
-    if cursor.rowcount == 0:
-        cursor.execute(
+            CREATE TABLE IF NOT EXISTS contracts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                entry_id TEXT NOT NULL,
+                energy_type TEXT NOT NULL,
+                contract_type TEXT NOT NULL,
+                segment TEXT NOT NULL,
+                supplier TEXT NOT NULL,
+                contract_name TEXT NOT NULL,
+                price_component TEXT NOT NULL,
+                month TEXT NULL,
+                year TEXT NULL,
+                sensor_id TEXT NULL,
+                UNIQUE(energy_type, contract_type, segment, supplier, contract_name, price_component, month, year)
+            )
+            """,
             """
-            INSERT INTO custom_sensors (entry_id, original_sensor_id, custom_sensor_name)
-            VALUES (?, ?, ?)
-        """,
-            (entry_id, original_sensor_id, custom_sensor_name),
-        )
-
-    conn.commit()
-    conn.close()
-
-
-def get_contracts(entry_id):
-    """Retrieve contracts for a specific config entry."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT * FROM contracts WHERE entry_id=?", (entry_id,))
-    contracts = cursor.fetchall()
-
-    conn.close()
-    return contracts
-
-
-def get_top_contracts(entry_id):
-    """Retrieve top contracts for a specific config entry."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT * FROM top_contracts WHERE entry_id=?", (entry_id,))
-    contracts = cursor.fetchall()
-
-    conn.close()
-    return contracts
-
-
-def get_custom_sensors(entry_id):
-    """Retrieve all custom sensor mappings."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT * FROM custom_sensors WHERE entry_id=?", (entry_id,))
-    sensors = cursor.fetchall()
-
-    conn.close()
-    return sensors
-
-
-def update_sensor_id(
-    sensor_id,
-    energy_type,
-    contract_type,
-    segment,
-    supplier,
-    contract_name,
-    price_component,
-    month=None,
-    year=None,
-):
-    """Update sensor id."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    clean_sensor_id = strip_suffix(sensor_id)
-
-    cursor.execute(
-        """
-        UPDATE contracts
-        SET sensor_id=?
-        WHERE energy_type=? AND contract_type=? AND segment=? AND supplier=? AND contract_name=? AND price_component=? AND month=? AND year=?
-    """,
+            CREATE TABLE IF NOT EXISTS top_contracts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                entry_id TEXT NOT NULL,
+                energy_type TEXT NOT NULL,
+                contract_type TEXT NOT NULL,
+                segment TEXT NOT NULL,
+                supplier TEXT NOT NULL,
+                contract_name TEXT NOT NULL,
+                price_component TEXT NOT NULL,
+                month TEXT NULL,
+                year TEXT NULL,
+                ranking TEXT NOT NULL,
+                UNIQUE(ranking)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS custom_sensors (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                entry_id TEXT NOT NULL,
+                original_sensor_id TEXT NOT NULL,
+                custom_sensor_name TEXT NOT NULL,
+                UNIQUE(custom_sensor_name)
+            )
+            """,
+        ),
+    ),
+    (
+        2,
         (
-            clean_sensor_id,
-            energy_type,
-            contract_type,
-            segment,
-            supplier,
-            contract_name,
-            price_component,
-            month if month is not None else "NULL",
-            year if year is not None else "NULL",
+            # Replace the "NULL" sentinels with real NULLs
+            "UPDATE contracts SET month = NULL WHERE month = 'NULL'",
+            "UPDATE contracts SET year = NULL WHERE year = 'NULL'",
+            "UPDATE contracts SET sensor_id = NULL WHERE sensor_id = 'NULL'",
+            "UPDATE top_contracts SET month = NULL WHERE month = 'NULL'",
+            "UPDATE top_contracts SET year = NULL WHERE year = 'NULL'",
+            # NULLs are distinct in UNIQUE constraints, keep contracts unique
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_contracts_identity
+            ON contracts(energy_type, contract_type, segment, supplier, contract_name,
+                         price_component, IFNULL(month, ''), IFNULL(year, ''))
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_contracts_entry_id ON contracts(entry_id)",
+            "CREATE INDEX IF NOT EXISTS idx_contracts_sensor_id ON contracts(sensor_id)",
+            "CREATE INDEX IF NOT EXISTS idx_top_contracts_entry_id ON top_contracts(entry_id)",
+            "CREATE INDEX IF NOT EXISTS idx_custom_sensors_entry_id ON custom_sensors(entry_id)",
+            """
+            CREATE INDEX IF NOT EXISTS idx_custom_sensors_original_sensor_id
+            ON custom_sensors(original_sensor_id)
+            """,
         ),
-    )
-
-    conn.commit()
-    conn.close()
+    ),
+)
 
+CREATE_SCHEMA_VERSION = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+SELECT_SCHEMA_VERSION = "SELECT IFNULL(MAX(version), 0) FROM schema_version"
+INSERT_SCHEMA_VERSION = "INSERT INTO schema_version (version) VALUES (?)"
+
+# Statements are module constants so sqlite3's per-connection statement cache
+# hands back the prepared statement instead of compiling them again.
+INSERT_CONTRACT = """
+    INSERT INTO contracts (entry_id, energy_type, contract_type, segment, supplier, contract_name, price_component, month, year, sensor_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+INSERT_OR_IGNORE_CONTRACT = """
+    INSERT OR IGNORE INTO contracts (entry_id, energy_type, contract_type, segment, supplier, contract_name, price_component, month, year, sensor_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+UPSERT_CUSTOM_SENSOR = """
+    INSERT INTO custom_sensors (entry_id, original_sensor_id, custom_sensor_name)
+    VALUES (?, ?, ?)
+    ON CONFLICT(custom_sensor_name) DO UPDATE
+    SET entry_id = excluded.entry_id, original_sensor_id = excluded.original_sensor_id
+"""
+UPDATE_CUSTOM_SENSOR = """
+    UPDATE custom_sensors
+    SET entry_id = ?, original_sensor_id = ?
+    WHERE custom_sensor_name = ?
+"""
+INSERT_CUSTOM_SENSOR = """
+    INSERT INTO custom_sensors (entry_id, original_sensor_id, custom_sensor_name)
+    VALUES (?, ?, ?)
+"""
+SELECT_CONTRACTS = "SELECT * FROM contracts WHERE entry_id=?"
+SELECT_TOP_CONTRACTS = "SELECT * FROM top_contracts WHERE entry_id=?"
+SELECT_CUSTOM_SENSORS = "SELECT * FROM custom_sensors WHERE entry_id=?"
+UPDATE_SENSOR_ID = "UPDATE contracts SET sensor_id=? WHERE id=?"
+DELETE_OTHER_CONTRACTS = "DELETE FROM contracts WHERE entry_id != ?"
+DELETE_OTHER_CUSTOM_SENSORS = "DELETE FROM custom_sensors WHERE entry_id != ?"
+DELETE_CONTRACT = "DELETE FROM contracts WHERE sensor_id = ?"
+DELETE_CUSTOM_SENSORS_OF = "DELETE FROM custom_sensors WHERE original_sensor_id = ?"
+DELETE_CUSTOM_SENSOR = "DELETE FROM custom_sensors WHERE custom_sensor_name = ?"
+DELETE_TOP_CONTRACTS = "DELETE FROM top_contracts"
+UPDATE_TOP_CONTRACT = """
+    UPDATE top_contracts
+    SET entry_id = ?, energy_type = ?, contract_type = ?, segment = ?, supplier = ?,
+        contract_name = ?, price_component = ?, month = ?, year = ?
+    WHERE ranking = ?
+"""
+INSERT_TOP_CONTRACT = """
+    INSERT INTO top_contracts (entry_id, energy_type, contract_type, segment, supplier,
+                                contract_name, price_component, month, year, ranking)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+async def async_get_db(hass):
+    """Return the shared contracts database, opening it on first use.
+
+    The connection outlives config entry reloads and is closed when Home
+    Assistant stops. A database that fails to open is not kept, so the next
+    call tries again.
+    """
+    db = hass.data.get(DATA_DB)
+    if db is None:
+        # Cached before it opens, so concurrent callers share the instance
+        db = hass.data[DATA_DB] = SecDatabase(hass.config.path(DB_FILENAME))
+        try:
+            await db.async_initialize()
+        except BaseException:
+            hass.data.pop(DATA_DB, None)
+            await db.async_close()
+            raise
+
+        async def _async_close(event):
+            hass.data.pop(DATA_DB, None)
+            await db.async_close()
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_close)
+    return db
+
+
+class SecDatabase:
+    """Contracts database on one long-lived WAL connection.
+
+    All statements run on a single dedicated worker thread that owns the
+    connection, so callers on the event loop only await the result.
+    """
+
+    def __init__(self, path) -> None:
+        """Initialize the database."""
+        self._path = path
+        self._conn = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"{DOMAIN}_db"
+        )
+        self.timings = Timings()
 
-def remove_all_except_entry_id(entry_id):
-    """Remove all entries from the contracts table except those with a specific entry_id."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    async def _async_run(self, func, *args, **kwargs):
+        """Run a statement function on the database thread, timing the call.
 
-    cursor.execute(
+        Calls are timed under the name of the calling method, so writes that
+        share _execute_many are told apart.
         """
-        DELETE FROM contracts
-        WHERE entry_id != ?
-        """,
-        (entry_id,),
-    )
+        name = sys._getframe(1).f_code.co_name.removeprefix("async_")
+        with self.timings.measure(name):
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, partial(func, *args, **kwargs)
+            )
+
+    async def async_initialize(self):
+        """Open the connection and create the tables."""
+        await self._async_run(self._initialize)
+
+    async def async_close(self):
+        """Close the connection and stop the database thread."""
+        await self._async_run(self._close)
+        self._executor.shutdown(wait=False)
+
+    async def async_add_contract(self, *args, **kwargs):
+        """Add a new contract to the database."""
+        await self._async_run(self._add_contract, *args, **kwargs)
+
+    async def async_add_custom_sensor(
+        self, entry_id, original_sensor_id, custom_sensor_name
+    ):
+        """Insert or update a custom sensor mapping."""
+        await self._async_run(
+            self._add_custom_sensor, entry_id, original_sensor_id, custom_sensor_name
+        )
 
-    cursor.execute(
-        """
-        DELETE FROM custom_sensors
-        WHERE entry_id != ?
-        """,
-        (entry_id,),
-    )
+    async def async_import_contracts(self, entry_id, contracts, aliases):
+        """Add contracts and their aliases in one transaction.
 
-    conn.commit()
-    conn.close()
+        contracts holds (energy_type, contract_type, segment, supplier,
+        contract_name, price_component, month, year) rows, aliases holds
+        (original_sensor_id, custom_sensor_name) pairs.
+        """
+        await self._async_run(self._import_contracts, entry_id, contracts, aliases)
 
+    async def async_get_contracts(self, entry_id):
+        """Retrieve contracts for a specific config entry."""
+        return await self._async_run(self._fetchall, SELECT_CONTRACTS, (entry_id,))
 
-def remove_contract(sensor_id):
-    """Remove contract and related custom sensors by given contract id."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    async def async_get_top_contracts(self, entry_id):
+        """Retrieve top contracts for a specific config entry."""
+        return await self._async_run(
+            self._fetchall, SELECT_TOP_CONTRACTS, (entry_id,)
+        )
 
-    cursor.execute(
-        """
-        DELETE FROM contracts
-        WHERE sensor_id = ?
-        """,
-        (sensor_id,),
-    )
+    async def async_get_custom_sensors(self, entry_id):
+        """Retrieve all custom sensor mappings for a specific config entry."""
+        return await self._async_run(
+            self._fetchall, SELECT_CUSTOM_SENSORS, (entry_id,)
+        )
 
-    cursor.execute(  # Also remove related custom sensors
-        """
-        DELETE FROM custom_sensors
-        WHERE original_sensor_id = ?
-        """,
-        (sensor_id,),
-    )
+    async def async_get_entities(self, entry_id):
+        """Retrieve the contracts, custom sensors and top contracts of an entry at once."""
+        return await self._async_run(
+            self._fetch_queries,
+            (SELECT_CONTRACTS, (entry_id,)),
+            (SELECT_CUSTOM_SENSORS, (entry_id,)),
+            (SELECT_TOP_CONTRACTS, (entry_id,)),
+        )
 
-    conn.commit()
-    conn.close()
+    async def async_update_sensor_id(self, contract_id, sensor_id):
+        """Store the entity id of the sensor of a contract."""
+        await self._async_run(
+            self._execute_many,
+            (UPDATE_SENSOR_ID, (strip_suffix(sensor_id), contract_id)),
+        )
 
+    async def async_remove_all_except_entry_id(self, entry_id):
+        """Remove all contracts and custom sensors not owned by entry_id."""
+        await self._async_run(
+            self._execute_many,
+            (DELETE_OTHER_CONTRACTS, (entry_id,)),
+            (DELETE_OTHER_CUSTOM_SENSORS, (entry_id,)),
+        )
 
-def remove_custom_sensor(sensor_name):
-    """Unregister custom sensor alias."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    async def async_remove_contract(self, sensor_id):
+        """Remove contract and related custom sensors by given contract id."""
+        await self._async_run(
+            self._execute_many,
+            (DELETE_CONTRACT, (sensor_id,)),
+            (DELETE_CUSTOM_SENSORS_OF, (sensor_id,)),
+        )
 
-    cursor.execute(
-        """
-        DELETE FROM custom_sensors
-        WHERE custom_sensor_name = ?
-        """,
-        (sensor_name,),
-    )
+    async def async_remove_custom_sensor(self, sensor_name):
+        """Unregister custom sensor alias."""
+        await self._async_run(
+            self._execute_many, (DELETE_CUSTOM_SENSOR, (sensor_name,))
+        )
 
-    conn.commit()
-    conn.close()
+    async def async_empty_top_contracts(self):
+        """Empty top contracts table."""
+        await self._async_run(self._execute_many, (DELETE_TOP_CONTRACTS, ()))
 
+    async def async_add_top_contract(self, *args, **kwargs):
+        """Insert or update a row in the top_contracts table based on the ranking."""
+        await self._async_run(self._add_top_contract, *args, **kwargs)
 
-def empty_top_contracts():
-    """Empty top contracts table."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    def _initialize(self):
+        """Open the connection in WAL mode and migrate the schema."""
+        db_dir = os.path.dirname(self._path)
+        if not os.path.exists(db_dir):
+            os.makedirs(db_dir)
 
-    cursor.execute(
-        """
-        DELETE FROM top_contracts;
-        """
-    )
+        self._conn = sqlite3.connect(
+            self._path, check_same_thread=False, cached_statements=CACHED_STATEMENTS
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+
+    def _migrate(self):
+        """Apply the migrations newer than the stored schema version."""
+        self._conn.execute(CREATE_SCHEMA_VERSION)
+        current = self._conn.execute(SELECT_SCHEMA_VERSION).fetchone()[0]
+
+        for version, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            _LOGGER.debug("Migrating contracts database to version %s", version)
+            try:
+                self._conn.execute("BEGIN")
+                for sql in statements:
+                    self._conn.execute(sql)
+                self._conn.execute(INSERT_SCHEMA_VERSION, (version,))
+                self._conn.commit()
+            except sqlite3.Error:
+                self._conn.rollback()
+                raise
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _fetchall(self, sql, params):
+        return self._conn.execute(sql, params).fetchall()
+
+    def _fetch_queries(self, *queries):
+        """Run several queries in one round trip to the database thread."""
+        return tuple(
+            self._conn.execute(sql, params).fetchall() for sql, params in queries
+        )
 
-    conn.commit()
-    conn.close()
-
-
-def add_top_contract(
-    ranking,
-    entry_id,
-    energy_type,
-    contract_type,
-    segment,
-    supplier,
-    contract_name,
-    price_component,
-    month=None,
-    year=None,
-):
-    """Insert or update a row in the top_contracts table based on the ranking."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        UPDATE top_contracts
-        SET entry_id = ?, energy_type = ?, contract_type = ?, segment = ?, supplier = ?,
-            contract_name = ?, price_component = ?, month = ?, year = ?
-        WHERE ranking = ?
-        """,
-        (
+    def _execute_many(self, *statements):
+        """Run statements in a single transaction."""
+        with self._conn:
+            for sql, params in statements:
+                self._conn.execute(sql, params)
+
+    def _add_contract(
+        self,
+        entry_id,
+        energy_type,
+        contract_type,
+        segment,
+        supplier,
+        contract_name,
+        price_component,
+        month=None,
+        year=None,
+    ):
+        try:
+            with self._conn:
+                self._conn.execute(
+                    INSERT_CONTRACT,
+                    (
+                        entry_id,
+                        energy_type,
+                        contract_type,
+                        segment,
+                        supplier,
+                        contract_name,
+                        price_component,
+                        month,
+                        year,
+                        None,
+                    ),
+                )
+        except sqlite3.IntegrityError:
+            pass
+
+    def _import_contracts(self, entry_id, contracts, aliases):
+        with self._conn:
+            self._conn.executemany(
+                INSERT_OR_IGNORE_CONTRACT,
+                (
+                    (
+                        entry_id,
+                        *row,
+                        None,
+                    )
+                    for row in contracts
+                ),
+            )
+            self._conn.executemany(
+                UPSERT_CUSTOM_SENSOR,
+                ((entry_id, sensor_id, alias) for sensor_id, alias in aliases),
+            )
+
+    def _add_custom_sensor(self, entry_id, original_sensor_id, custom_sensor_name):
+        with self._conn:
+            cursor = self._conn.execute(
+                UPDATE_CUSTOM_SENSOR, (entry_id, original_sensor_id, custom_sensor_name)
+            )
+            if cursor.rowcount == 0:
+                self._conn.execute(
+                    INSERT_CUSTOM_SENSOR,
+                    (entry_id, original_sensor_id, custom_sensor_name),
+                )
+
+    def _add_top_contract(
+        self,
+        ranking,
+        entry_id,
+        energy_type,
+        contract_type,
+        segment,
+        supplier,
+        contract_name,
+        price_component,
+        month=None,
+        year=None,
+    ):
+        row = (
             entry_id,
             energy_type,
             contract_type,
@@ -329,35 +430,14 @@ def add_top_contract(
             supplier,
             contract_name,
             price_component,
-            month if month is not None else "NULL",
-            year if year is not None else "NULL",
+            month,
+            year,
             ranking,
-        ),
-    )
-
-    if cursor.rowcount == 0:
-        cursor.execute(
-            """
-            INSERT INTO top_contracts (entry_id, energy_type, contract_type, segment, supplier,
-                                        contract_name, price_component, month, year, ranking)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                entry_id,
-                energy_type,
-                contract_type,
-                segment,
-                supplier,
-                contract_name,
-                price_component,
-                month if month is not None else "NULL",
-                year if year is not None else "NULL",
-                ranking,
-            ),
         )
-
-    conn.commit()
-    conn.close()
+        with self._conn:
+            cursor = self._conn.execute(UPDATE_TOP_CONTRACT, row)
+            if cursor.rowcount == 0:
+                self._conn.execute(INSERT_TOP_CONTRACT, row)
 
 
 def strip_suffix(sensor_id):
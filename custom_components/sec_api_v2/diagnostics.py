@@ -0,0 +1,60 @@
+"""Diagnostics support for Smart Energy Control."""
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import API_KEY, DOMAIN
+from .db import DATA_DB
+from .telemetry import hit_ratio
+
+TO_REDACT = {API_KEY, "Authorization"}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry):
+    """Return runtime telemetry of a config entry, without the API key."""
+    data = hass.data[DOMAIN][entry.entry_id]
+    api = data["api"]
+    coordinator = data["coordinator"]
+    hub = data.get("custom_sensor_hub")
+    db = hass.data.get(DATA_DB)
+
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "api": {
+            "period": [api.jaar, api.maand],
+            "requests": api.requests.as_dict(),
+            "retries": api.retries,
+            "circuit_breaker": {
+                "state": api.breaker.state,
+                "opened": api.breaker.opened,
+                "short_circuited": api.breaker.short_circuited,
+            },
+            "coalesced_requests": {
+                "hits": api.inflight_hits,
+                "misses": api.inflight_misses,
+            },
+            "response_cache": {
+                "entries": len(api.cache),
+                "hits": api.cache.hits,
+                "misses": api.cache.misses,
+                "revalidated": api.cache.revalidated,
+                "hit_ratio": hit_ratio(api.cache.hits, api.cache.misses),
+            },
+        },
+        "coordinator": {
+            "groups": len(coordinator.groups),
+            "stale_groups": len(coordinator.stale_groups),
+            "last_update_success": coordinator.last_update_success,
+            "refreshes": coordinator.refreshes.as_dict(),
+            "state_writes": coordinator.state_writes,
+            "suppressed_writes": coordinator.suppressed_writes,
+        },
+        "custom_sensors": None
+        if hub is None
+        else {
+            "state_writes": hub.state_writes,
+            "suppressed_writes": hub.suppressed_writes,
+        },
+        "database": None if db is None else db.timings.as_dict(),
+    }
@@ -0,0 +1,185 @@
+"""On-demand CPU and memory profiling of the event loop."""
+
+import asyncio
+import cProfile
+from pathlib import Path
+import pstats
+import tracemalloc
+
+from .const import DOMAIN
+
+DATA_PROFILE_LOCK = f"{DOMAIN}_profile_lock"
+PROFILE_FILENAME = "sec_api_v2_profile_{}.{}"
+
+PROFILER_CPROFILE = "cprofile"
+PROFILER_SAMPLING = "sampling"
+SORT_KEYS = {"cumulative": "cumulative_ms", "self": "self_ms"}
+
+PACKAGE_DIR = str(Path(__file__).parent)
+
+
+def async_get_profile_lock(hass):
+    """Return the lock that allows one profile at a time in the process."""
+    lock = hass.data.get(DATA_PROFILE_LOCK)
+    if lock is None:
+        lock = hass.data[DATA_PROFILE_LOCK] = asyncio.Lock()
+    return lock
+
+
+def _location(filename, line, function=None):
+    """Return a short file:line(function) label."""
+    label = f"{'/'.join(Path(filename).parts[-2:])}:{line}"
+    return label if function is None else f"{label}({function})"
+
+
+def _top(functions, sort, limit, integration_only):
+    """Return the most expensive functions, optionally only those of this package."""
+    if integration_only:
+        functions = [f for f in functions if f.pop("file").startswith(PACKAGE_DIR)]
+    else:
+        for function in functions:
+            del function["file"]
+    functions.sort(key=lambda f: f[SORT_KEYS[sort]], reverse=True)
+    return functions[:limit]
+
+
+class CProfileRun:
+    """Deterministic profile of every call made on the event loop thread."""
+
+    name = PROFILER_CPROFILE
+    suffix = "prof"
+
+    def __init__(self) -> None:
+        """Initialize the profiler."""
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        """Start profiling, ValueError if another profiler is active."""
+        self._profile.enable()
+
+    def stop(self):
+        """Stop profiling."""
+        self._profile.disable()
+
+    def save(self, path):
+        """Write the stats, readable with pstats or snakeviz."""
+        self._profile.dump_stats(path)
+
+    def top(self, sort, limit, integration_only):
+        """Return the most expensive functions."""
+        stats = pstats.Stats(self._profile).stats
+        functions = [
+            {
+                "function": _location(filename, line, function),
+                "file": filename,
+                "calls": calls,
+                "self_ms": round(self_time * 1000, 3),
+                "cumulative_ms": round(cumulative * 1000, 3),
+            }
+            for (filename, line, function), (_, calls, self_time, cumulative, _) in (
+                stats.items()
+            )
+        ]
+        return _top(functions, sort, limit, integration_only)
+
+
+class SamplingRun:
+    """Statistical profile of the event loop thread, with little overhead.
+
+    Needs pyinstrument, which is imported on first use so the integration
+    runs without it.
+    """
+
+    name = PROFILER_SAMPLING
+    suffix = "pyisession"
+
+    def __init__(self) -> None:
+        """Initialize the profiler, ImportError without pyinstrument."""
+        from pyinstrument import Profiler  # pylint: disable=import-outside-toplevel
+
+        # Sample the whole thread, refreshes run in other tasks than the service
+        self._profiler = Profiler(async_mode="disabled")
+        self._session = None
+
+    def start(self):
+        """Start sampling."""
+        self._profiler.start()
+
+    def stop(self):
+        """Stop sampling."""
+        self._session = self._profiler.stop()
+
+    def save(self, path):
+        """Write the session, readable with pyinstrument --load."""
+        self._session.save(path)
+
+    def top(self, sort, limit, integration_only):
+        """Return the functions with the most samples."""
+        functions = {}
+        stack = [(self._session.root_frame(), frozenset())]
+        while stack:
+            frame, callers = stack.pop()
+            if frame is None or frame.is_synthetic:
+                # Self time frames are already in total_self_time of their parent
+                continue
+            key = (frame.file_path or "", frame.line_no, frame.function)
+            function = functions.get(key)
+            if function is None:
+                function = functions[key] = {
+                    "function": _location(*key),
+                    "file": key[0],
+                    "calls": None,
+                    "self_ms": 0.0,
+                    "cumulative_ms": 0.0,
+                }
+            function["self_ms"] += frame.total_self_time * 1000
+            if key not in callers:
+                # Recursive frames are already counted by their outermost call
+                function["cumulative_ms"] += frame.time * 1000
+            stack.extend((child, callers | {key}) for child in frame.children)
+
+        for function in functions.values():
+            function["self_ms"] = round(function["self_ms"], 3)
+            function["cumulative_ms"] = round(function["cumulative_ms"], 3)
+        return _top(list(functions.values()), sort, limit, integration_only)
+
+
+class MemoryDiff:
+    """Allocations that grew between the start and the end of a profile."""
+
+    def __init__(self) -> None:
+        """Initialize without snapshots."""
+        self._started = False
+        self._before = None
+        self._after = None
+
+    def start(self):
+        """Start tracing allocations if needed and take the first snapshot."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+        self._before = tracemalloc.take_snapshot()
+
+    def stop(self):
+        """Take the second snapshot, stopping tracing if it was started here."""
+        self._after = tracemalloc.take_snapshot()
+        if self._started:
+            tracemalloc.stop()
+
+    def top(self, limit, integration_only):
+        """Return the lines whose allocations grew the most."""
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        if integration_only:
+            filters.append(tracemalloc.Filter(True, f"{PACKAGE_DIR}/*"))
+        after = self._after.filter_traces(filters)
+        before = self._before.filter_traces(filters)
+        return [
+            {
+                "line": _location(stat.traceback[0].filename, stat.traceback[0].lineno),
+                "size_diff_kb": round(stat.size_diff / 1024, 1),
+                "size_kb": round(stat.size / 1024, 1),
+                "count_diff": stat.count_diff,
+            }
+            for stat in after.compare_to(before, "lineno")[:limit]
+        ]
+
@@ -0,0 +1,124 @@
+"""Top-N ranking of price components."""
+
+from functools import partial
+import heapq
+from itertools import count
+
+MISSING_EXCLUDE = "exclude"
+MISSING_LAST = "last"
+
+DEFAULT_METRIC = "today_avg"
+DEFAULT_ANNUAL_CONSUMPTION = 3500
+
+
+def _price(record, prices, key):
+    prices = getattr(record, prices)
+    if not prices:
+        return None
+    value = prices.get(key)
+    # Exact type checks are cheaper than isinstance and leave out bools
+    if value.__class__ is float or value.__class__ is int:
+        return value
+    return None
+
+
+def current_price(record):
+    """Return the current offtake price."""
+    return _price(record, "prices_afname", "current_price")
+
+
+def today_avg(record):
+    """Return today's average offtake price."""
+    return _price(record, "prices_afname", "today_avg_anchor_10kwh")
+
+
+def injection_price(record):
+    """Return the current injection price, negated so a higher price ranks first."""
+    price = _price(record, "prices_injectie", "current_price")
+    return -price if price is not None else None
+
+
+def annual_cost(
+    record, annual_consumption=DEFAULT_ANNUAL_CONSUMPTION, annual_injection=0
+):
+    """Return the estimated annual energy cost at today's average prices."""
+    offtake = today_avg(record)
+    if offtake is None:
+        return None
+    cost = annual_consumption * offtake
+    if annual_injection:
+        injection = _price(record, "prices_injectie", "current_price")
+        if injection is None:
+            return None
+        cost -= annual_injection * injection
+    return cost
+
+
+# Lower is better for every metric
+METRICS = {
+    "current_price": current_price,
+    "today_avg": today_avg,
+    "injection_price": injection_price,
+    "annual_cost": annual_cost,
+}
+
+
+class TopN:
+    """Keep the n best records of a stream by a metric.
+
+    A bounded max-heap holds the current best n, so ranking m records costs
+    O(m log n) and never holds more than n of them. Records without the metric
+    are dropped, or kept after the ranked ones with missing="last".
+    """
+
+    def __init__(
+        self, n, metric=DEFAULT_METRIC, missing=MISSING_EXCLUDE, **metric_args
+    ) -> None:
+        """Initialize the ranking, n must be at least 1."""
+        if n < 1:
+            raise ValueError(f"Cannot keep the best {n} records")
+        self._n = n
+        self._score = (
+            partial(METRICS[metric], **metric_args) if metric_args else METRICS[metric]
+        )
+        self._missing_policy = missing
+        self._heap = []
+        self._missing = []
+        self._seq = count()
+        self.missing_count = 0
+
+    def push(self, record):
+        """Offer one record to the ranking."""
+        self.extend((record,))
+
+    def extend(self, records):
+        """Offer many records to the ranking."""
+        score_of = self._score
+        heap = self._heap
+        n = self._n
+        seq = self._seq
+        for record in records:
+            score = score_of(record)
+            if score is None:
+                self.missing_count += 1
+                if self._missing_policy == MISSING_LAST and len(self._missing) < n:
+                    self._missing.append(record)
+                continue
+
+            # Negated for a max-heap, the sequence keeps ties in arrival order
+            if len(heap) < n:
+                heapq.heappush(heap, (-score, -next(seq), record))
+            elif -score > heap[0][0]:
+                heapq.heapreplace(heap, (-score, -next(seq), record))
+
+    def result(self):
+        """Return the best records, best first."""
+        ranked = [item[2] for item in sorted(self._heap, reverse=True)]
+        return (ranked + self._missing)[: self._n]
+
+
+def top_n(records, n, metric=DEFAULT_METRIC, missing=MISSING_EXCLUDE, **metric_args):
+    """Return the n best records by a metric, best first."""
+    ranking = TopN(n, metric, missing, **metric_args)
+    ranking.extend(records)
+    return ranking.result()
@@ -0,0 +1,126 @@
+"""Retry and circuit breaker policy for the API client."""
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import logging
+import random
+import time
+
+import aiohttp
+
+from .const import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_MAX,
+    BREAKER_RESET_TIMEOUT,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Statuses worth another attempt, anything else is returned to the caller
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(aiohttp.ClientError):
+    """Request short-circuited while the API is considered down."""
+
+
+def backoff_delay(attempt, base=RETRY_BACKOFF_BASE, cap=RETRY_BACKOFF_MAX):
+    """Return a full-jitter exponential backoff delay in seconds."""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def retry_after(response):
+    """Return the delay a Retry-After header asks for in seconds, if any."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max((moment - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class CircuitBreaker:
+    """Stop sending requests after repeated failures.
+
+    After failure_threshold failures in a row the circuit opens and requests
+    fail fast. Once the reset timeout has passed a single trial request is let
+    through: success closes the circuit, failure opens it again for twice as
+    long, up to BREAKER_RESET_MAX. Opening and closing are logged once, the
+    requests failing fast in between are not.
+    """
+
+    def __init__(
+        self,
+        failure_threshold=BREAKER_FAILURE_THRESHOLD,
+        reset_timeout=BREAKER_RESET_TIMEOUT,
+    ) -> None:
+        """Initialize the breaker closed."""
+        self._threshold = failure_threshold
+        self._base_timeout = reset_timeout
+        self._timeout = reset_timeout
+        self._failures = 0
+        self._opened_until = None
+        self._trial = False
+        self.opened = 0
+        self.short_circuited = 0
+
+    @property
+    def state(self):
+        """Return closed, open or half_open."""
+        if self._opened_until is None:
+            return "closed"
+        if time.monotonic() < self._opened_until or self._trial:
+            return "open"
+        return "half_open"
+
+    def before_request(self):
+        """Raise CircuitOpenError unless a request may be sent.
+
+        Returns whether the request is the trial of a half open circuit.
+        """
+        if self._opened_until is None:
+            return False
+        if time.monotonic() < self._opened_until or self._trial:
+            self.short_circuited += 1
+            raise CircuitOpenError("Smart Energy Control API unavailable, circuit open")
+        self._trial = True
+        return True
+
+    def release_trial(self):
+        """Let another request try when the trial ended without an outcome."""
+        self._trial = False
+
+    def record_success(self):
+        """Close the circuit."""
+        if self._opened_until is not None:
+            _LOGGER.info("Smart Energy Control API reachable again, circuit closed")
+        self._failures = 0
+        self._opened_until = None
+        self._trial = False
+        self._timeout = self._base_timeout
+
+    def record_failure(self, wait=None):
+        """Count a failure, opening the circuit at the threshold or when told to wait."""
+        self._failures += 1
+        if self._trial:
+            self._timeout = min(self._timeout * 2, BREAKER_RESET_MAX)
+        elif self._failures < self._threshold and wait is None:
+            return
+        self._trial = False
+        pause = max(self._timeout, wait or 0)
+        if self._opened_until is None:
+            _LOGGER.warning(
+                "Smart Energy Control API unavailable, circuit open for %.0f s", pause
+            )
+        else:
+            _LOGGER.debug("Circuit trial failed, open again for %.0f s", pause)
+        self._opened_until = time.monotonic() + pause
+        self.opened += 1
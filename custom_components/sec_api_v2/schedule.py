@@ -0,0 +1,26 @@
+"""Price publication schedule."""
+
+from datetime import datetime, timedelta
+
+from .const import PUBLICATION_INTERVAL, PUBLICATION_WINDOW_END, PUBLICATION_WINDOW_START
+
+
+def next_price_change(
+    now: datetime,
+    window_start: int = PUBLICATION_WINDOW_START,
+    window_end: int = PUBLICATION_WINDOW_END,
+    interval: int = PUBLICATION_INTERVAL,
+) -> datetime:
+    """Return the next moment published prices can change.
+
+    Prices roll over on the hour. Between window_start and window_end the
+    day-ahead prices get published, so every interval minutes is a candidate.
+    """
+    hour = now.replace(minute=0, second=0, microsecond=0)
+    next_hour = hour + timedelta(hours=1)
+
+    if window_start <= now.hour < window_end:
+        step = timedelta(minutes=interval)
+        return min(hour + ((now - hour) // step + 1) * step, next_hour)
+
+    return next_hour
@@ -0,0 +1,107 @@
+"""Wall-clock aligned refresh scheduler."""
+
+from collections import defaultdict
+from functools import partial
+import logging
+import zlib
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later, async_track_point_in_time
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CONF_MAX_JITTER,
+    CONF_WINDOW_END,
+    CONF_WINDOW_INTERVAL,
+    CONF_WINDOW_START,
+    DEFAULT_MAX_JITTER,
+    PUBLICATION_INTERVAL,
+    PUBLICATION_WINDOW_END,
+    PUBLICATION_WINDOW_START,
+)
+from .schedule import next_price_change
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def publication_window(options):
+    """Return the (start, end, interval) publication window from entry options."""
+    return (
+        options.get(CONF_WINDOW_START, PUBLICATION_WINDOW_START),
+        options.get(CONF_WINDOW_END, PUBLICATION_WINDOW_END),
+        options.get(CONF_WINDOW_INTERVAL, PUBLICATION_INTERVAL),
+    )
+
+
+def group_offset(group, max_jitter):
+    """Return a stable delay in seconds in [0, max_jitter) for a contract group."""
+    if max_jitter <= 0:
+        return 0
+    return zlib.crc32(repr(group).encode()) % (max_jitter * 1000) / 1000
+
+
+class SecRefreshScheduler:
+    """Refresh contract groups when published prices can change.
+
+    Ticks fire on the hour and every interval minutes inside the day-ahead
+    publication window, in Home Assistant's timezone. Each group is refreshed
+    after its own bounded offset so groups do not hit the API in the same
+    second.
+    """
+
+    def __init__(self, hass: HomeAssistant, coordinator, options) -> None:
+        """Initialize the scheduler."""
+        self._hass = hass
+        self._coordinator = coordinator
+        self._unsub_tick = None
+        self._unsub_refresh = []
+        self.async_update_options(options)
+
+    @callback
+    def async_update_options(self, options):
+        """Apply new window and jitter settings from the entry options."""
+        self.window = publication_window(options)
+        self.max_jitter = options.get(CONF_MAX_JITTER, DEFAULT_MAX_JITTER)
+        if self._unsub_tick is not None:
+            self.async_stop()
+            self.async_start()
+
+    @callback
+    def async_start(self):
+        """Schedule the next tick."""
+        next_tick = next_price_change(dt_util.now(), *self.window)
+        self._unsub_tick = async_track_point_in_time(
+            self._hass, self._async_tick, next_tick
+        )
+
+    @callback
+    def async_stop(self):
+        """Cancel the next tick and pending group refreshes."""
+        if self._unsub_tick is not None:
+            self._unsub_tick()
+            self._unsub_tick = None
+        for unsub in self._unsub_refresh:
+            unsub()
+        self._unsub_refresh.clear()
+
+    @callback
+    def _async_tick(self, now):
+        """Spread the refresh of all groups over their offsets."""
+        self._unsub_refresh.clear()
+        buckets = defaultdict(list)
+        for group in self._coordinator.groups:
+            buckets[group_offset(group, self.max_jitter)].append(group)
+
+        for offset, groups in buckets.items():
+            self._unsub_refresh.append(
+                async_call_later(
+                    self._hass, offset, partial(self._async_refresh, groups)
+                )
+            )
+
+        self.async_start()
+
+    async def _async_refresh(self, groups, _now):
+        """Refresh one bucket of groups."""
+        _LOGGER.debug("Refreshing %s contract groups", len(groups))
+        await self._coordinator.async_refresh_groups(groups)
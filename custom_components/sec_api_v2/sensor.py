@@ -1,22 +1,27 @@
 """Sensor management."""
 
+import asyncio
 import logging
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
-from .const import DOMAIN
-from .db import get_contracts, get_custom_sensors, get_top_contracts
+from .const import DOMAIN, SIGNAL_ENTITIES_CHANGED
+from .db import async_get_db
 from .sensors import (
     constant_sensor,
     contract_sensor,
     custom_sensor,
+    telemetry_sensor,
     top_contract_sensor,
 )
 
 _LOGGER = logging.getLogger(__name__)
 
+CUSTOM_SENSOR_TYPES = ("all", "afname", "injectie")
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -24,49 +29,104 @@ async def async_setup_entry(
     async_add_entities,
 ):
     """Set up sensor platform from a config entry."""
-    contracts = await hass.async_add_executor_job(get_contracts, config_entry.entry_id)
-    custom_sensors = await hass.async_add_executor_job(
-        get_custom_sensors, config_entry.entry_id
-    )
-    top_contracts = await hass.async_add_executor_job(
-        get_top_contracts, config_entry.entry_id
+    api = hass.data[DOMAIN][config_entry.entry_id]["api"]
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+    hub = hass.data[DOMAIN][config_entry.entry_id]["custom_sensor_hub"] = (
+        custom_sensor.CustomSensorHub(hass)
     )
-    api = hass.data[DOMAIN][config_entry.entry_id]
-    entity_registry = er.async_get(hass)
-
-    sensors = []
-    for contract in contracts:
-        if entity_registry.async_get_entity_id(
-            DOMAIN, "sensor", contract[10].strip("sensor.")
-        ):
-            continue
-
-        sensor = contract_sensor.ContractSensor(hass, contract, api, config_entry)
-        sensors.append(sensor)
-
-    for contract in custom_sensors:
-        sensor = custom_sensor.CustomSensor(hass, contract[3], contract[2])
-        sensor_afname = custom_sensor.CustomSensor(
-            hass, contract[3], contract[2], "afname"
-        )
-        sensor_injectie = custom_sensor.CustomSensor(
-            hass, contract[3], contract[2], "injectie"
-        )
-        sensors.append(sensor)
-        sensors.append(sensor_afname)
-        sensors.append(sensor_injectie)
-
-    for contract in top_contracts:
-        if entity_registry.async_get_entity_id(
-            DOMAIN, "sensor", contract[10].strip("sensor.")
-        ):
-            continue
-
-        sensor = top_contract_sensor.TopContractSensor(
-            hass, contract, api, config_entry
+    entities = hass.data[DOMAIN][config_entry.entry_id]["entities"] = {}
+    lock = asyncio.Lock()
+
+    async def async_sync_entities(background_refresh=False):
+        """Add and remove sensors to match the database, leaving the rest running."""
+        db = await async_get_db(hass)
+        contracts, custom_sensors, top_contracts = await db.async_get_entities(
+            config_entry.entry_id
         )
-        sensors.append(sensor)
 
-    sensors.append(constant_sensor.ConstSensor(hass, config_entry, api))
+        wanted = {}
+        for contract in contracts:
+            wanted[("contract", contract[0])] = contract
+        for contract in custom_sensors:
+            for sensor_type in CUSTOM_SENSOR_TYPES:
+                wanted[("custom", contract[3], contract[2], sensor_type)] = contract
+        for contract in top_contracts:
+            wanted[("top", contract[10])] = contract
+
+        entity_registry = er.async_get(hass)
+        for key, (row, entity) in list(entities.items()):
+            # Top contract slots keep their key but may point at a new contract,
+            # re-ranking inserts the rows again so their ids are not compared
+            if key in wanted and (key[0] != "top" or wanted[key][1:] == row[1:]):
+                continue
+            del entities[key]
+            if key not in wanted and entity.registry_entry is not None:
+                # Gone for good, also drop it from the entity registry
+                entity_registry.async_remove(entity.entity_id)
+            else:
+                await entity.async_remove()
+
+        sensors = []
+        for key, row in wanted.items():
+            if key in entities:
+                continue
+            if key[0] == "contract":
+                sensor = contract_sensor.ContractSensor(
+                    hass, row, coordinator, config_entry
+                )
+            elif key[0] == "custom":
+                sensor = custom_sensor.CustomSensor(
+                    hass, hub, row[3], row[2], key[3]
+                )
+            else:
+                sensor = top_contract_sensor.TopContractSensor(
+                    hass, row, coordinator, config_entry
+                )
+            entities[key] = (row, sensor)
+            sensors.append(sensor)
 
-    async_add_entities(sensors, update_before_add=True)
+        # One request per new contract group instead of one per sensor
+        if coordinator.has_missing_groups():
+            if background_refresh:
+                # Do not hold up setup on the API, sensors fill in when it answers
+                config_entry.async_create_background_task(
+                    hass, coordinator.async_refresh(), f"{DOMAIN} first refresh"
+                )
+            else:
+                await coordinator.async_refresh()
+
+        if sensors:
+            async_add_entities(sensors)
+
+    async def async_entities_changed():
+        async with lock:
+            await async_sync_entities()
+
+    async with lock:
+        await async_sync_entities(background_refresh=True)
+    async_add_entities(
+        [
+            constant_sensor.ConstSensor(
+                hass,
+                config_entry,
+                api,
+                hass.data[DOMAIN][config_entry.entry_id]["snapshot"],
+            ),
+            *(
+                telemetry_sensor.TelemetrySensor(
+                    config_entry,
+                    hass.data[DOMAIN][config_entry.entry_id],
+                    *description,
+                )
+                for description in telemetry_sensor.TELEMETRY_SENSORS
+            ),
+        ]
+    )
+
+    config_entry.async_on_unload(
+        async_dispatcher_connect(
+            hass,
+            SIGNAL_ENTITIES_CHANGED.format(config_entry.entry_id),
+            async_entities_changed,
+        )
+    )
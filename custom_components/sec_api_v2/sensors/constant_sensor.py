@@ -11,7 +11,7 @@ _LOGGER = logging.getLogger(__name__)
 
 
 class ConstSensor(SensorEntity):
-    def __init__(self, hass, entry: ConfigEntry, api) -> None:
+    def __init__(self, hass, entry: ConfigEntry, api, snapshot=None) -> None:
         self._name = "SEC: Constant values"
         self._state = 0
         self._hass = hass
@@ -19,8 +19,14 @@ class ConstSensor(SensorEntity):
         self._entry = entry
         self._api = api
         self._attributes = {}
+        self._snapshot = snapshot
 
         self.entity_id = self._unique_id
+        if snapshot is not None:
+            snapshot.async_track("constants", lambda: self._constants)
+            self._constants = snapshot.restored.get("constants")
+        else:
+            self._constants = None
 
     @property
     def unique_id(self):
@@ -44,13 +50,33 @@ class ConstSensor(SensorEntity):
 
     async def async_added_to_hass(self):
         """When entity is added to hass."""
-        await self._update_constants()
-        self.async_write_ha_state()
+        if self._constants is not None:
+            # Show the snapshot right away, the API answer follows
+            self._set_constants(self._constants, stale=True)
+        # Fetched in the background so setup does not wait on the API
+        self._entry.async_create_background_task(
+            self.hass, self._update_constants(), f"{DOMAIN} constants refresh"
+        )
+
+    def _set_constants(self, constants, stale=False):
+        """Show a constants response."""
+        self._attributes = {**constants, "icon": "mdi:anvil"}
+        if stale:
+            self._attributes["stale"] = True
+        self._state = self._attributes.get("postcode", 0)
 
     async def _update_constants(self):
         """Fetch constants from the API and update attributes."""
         zip_code = self._entry.data.get("zip_code")
-        self._attributes = await self._api.get_constants(zip_code)
-        self._attributes.update({"icon": "mdi:anvil"})
-        self._state = self._attributes.get("postcode", 0)
+        constants = await self._api.get_constants(zip_code)
+        if constants is None:
+            if self._constants is None:
+                return
+            # Keep the last known constants, marked as stale
+            self._set_constants(self._constants, stale=True)
+        else:
+            self._constants = constants
+            self._set_constants(constants)
+            if self._snapshot is not None:
+                self._snapshot.async_schedule_save()
         self.async_write_ha_state()
@@ -0,0 +1,190 @@
+"""Base entity for sensors backed by a coordinator record."""
+
+from homeassistant.components.sensor import SensorEntity
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
+
+from ..const import (
+    ATTRIBUTE_PROFILE_FULL,
+    ATTRIBUTE_PROFILE_MINIMAL,
+    CONF_ATTRIBUTE_PROFILE,
+    CONF_SERIES_SLOTS,
+    DEFAULT_ATTRIBUTE_PROFILE,
+    DEFAULT_SERIES_SLOTS,
+    UNRECORDED_ATTRIBUTES,
+)
+from ..coordinator import group_key, record_key
+from ..series import current_slot, next_slot_change, upcoming_prices
+
+IDENTITY_FIELDS = (
+    "energietype",
+    "vast_variabel_dynamisch",
+    "segment",
+    "handelsnaam",
+    "productnaam",
+    "prijsonderdeel",
+)
+
+
+def project_attributes(record, profile):
+    """Return the state attributes of a record for an attribute profile.
+
+    minimal keeps the identity and current prices, prices adds the full
+    price dicts and full adds every other field under details. The price
+    dicts and details are shared with the record, not copied.
+    """
+    attributes = {field: getattr(record, field) for field in IDENTITY_FIELDS}
+    if profile == ATTRIBUTE_PROFILE_MINIMAL:
+        attributes["prices_afname"] = {
+            "current_price": record.prices_afname.get("current_price")
+        }
+        attributes["prices_injectie"] = {
+            "current_price": record.prices_injectie.get("current_price")
+        }
+        return attributes
+
+    attributes["prices_afname"] = record.prices_afname
+    attributes["prices_injectie"] = record.prices_injectie
+    if profile == ATTRIBUTE_PROFILE_FULL:
+        attributes["details"] = record.extra
+    return attributes
+
+
+class ContractRecordEntity(CoordinatorEntity, SensorEntity):
+    """Sensor showing one price component of the entry coordinator."""
+
+    # Bulky price data stays out of the recorder database
+    _unrecorded_attributes = UNRECORDED_ATTRIBUTES
+
+    def __init__(self, coordinator, config_entry, contract) -> None:
+        """Track the record of a contract row."""
+        (
+            self._id,
+            self._entry_id,
+            self._energy_type,
+            self._contract_type,
+            self._segment,
+            self._supplier,
+            self._contract_name,
+            self._price_component,
+            self._month,
+            self._year,
+        ) = contract[:10]
+        self._entry = config_entry
+        self._group = group_key(
+            self._energy_type,
+            self._contract_type,
+            self._segment,
+            self._month,
+            self._year,
+        )
+        self._key = record_key(
+            self._supplier, self._contract_name, self._price_component
+        )
+        self._projection = (None, None, None, None, None, None, None)
+        self._fingerprint = None
+        self._unsub_rollover = None
+
+        super().__init__(coordinator)
+        coordinator.async_track_contract(self._group, self._key)
+
+    async def async_added_to_hass(self) -> None:
+        """Remember what gets written when the sensor is added."""
+        await super().async_added_to_hass()
+        self._fingerprint = self._state_fingerprint()
+        self._async_schedule_rollover()
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Stop tracking the contract when the sensor is removed."""
+        await super().async_will_remove_from_hass()
+        self.coordinator.async_untrack_contract(self._group, self._key)
+        if self._unsub_rollover is not None:
+            self._unsub_rollover()
+            self._unsub_rollover = None
+
+    @callback
+    def _async_schedule_rollover(self) -> None:
+        """Rewrite the upcoming prices when the current price slot ends.
+
+        Slots are shorter than the time between coordinator updates, so the
+        sensor moves on to the next slot on its own.
+        """
+        if self._unsub_rollover is not None:
+            self._unsub_rollover()
+            self._unsub_rollover = None
+        series = self.series
+        change = next_slot_change(series, dt_util.utcnow()) if series else None
+        if change is not None:
+            self._unsub_rollover = async_track_point_in_utc_time(
+                self.hass, self._async_rollover, change
+            )
+
+    @callback
+    def _async_rollover(self, _now) -> None:
+        """Write the state for the new price slot."""
+        self._unsub_rollover = None
+        self._handle_coordinator_update()
+
+    def _state_fingerprint(self):
+        """Return what a state write of the sensor would contain."""
+        return (self.available, self.state, self.extra_state_attributes)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state only when the state or its attributes changed."""
+        self._async_schedule_rollover()
+        fingerprint = self._state_fingerprint()
+        if fingerprint == self._fingerprint:
+            self.coordinator.suppressed_writes += 1
+            return
+        self._fingerprint = fingerprint
+        self.coordinator.state_writes += 1
+        self.async_write_ha_state()
+
+    @property
+    def record(self):
+        """Return the current record of the contract."""
+        return self.coordinator.get_record(self._group, self._key)
+
+    @property
+    def series(self):
+        """Return the (afname, injectie) day-ahead price series, if fetched."""
+        return self.coordinator.get_series(self._group, self._key)
+
+    @property
+    def state(self):
+        """Return the state of the sensor."""
+        record = self.record
+        if record:
+            return f"{record.handelsnaam}: {record.productnaam}"
+        return None
+
+    @property
+    def extra_state_attributes(self):
+        """Return the state attributes for the configured profile."""
+        record = self.record
+        if not record:
+            return None
+
+        profile = self._entry.options.get(
+            CONF_ATTRIBUTE_PROFILE, DEFAULT_ATTRIBUTE_PROFILE
+        )
+        series = self.series
+        slots = self._entry.options.get(CONF_SERIES_SLOTS, DEFAULT_SERIES_SLOTS)
+        now = dt_util.now()
+        slot = current_slot(series, now) if series else None
+        stale_since = self.coordinator.staleness(self._group)
+        # Projected once per record, profile and price slot, not on every access
+        key = (record, profile, series, slot, slots, stale_since)
+        if self._projection[:6] != key:
+            attributes = project_attributes(record, profile)
+            if series:
+                attributes["upcoming_prices"] = upcoming_prices(series, now, slots)
+            if stale_since is not None:
+                # Served from a snapshot or an earlier refresh
+                attributes["stale"] = True
+                attributes["fetched_at"] = stale_since
+            self._projection = (*key, attributes)
+        return self._projection[6]
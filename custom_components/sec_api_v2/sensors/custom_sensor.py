@@ -2,31 +2,98 @@ from homeassistant.components.sensor import SensorEntity
 from homeassistant.core import callback
 from homeassistant.helpers.event import async_track_state_change_event
 
+from ..const import UNRECORDED_ATTRIBUTES
 from ..services import format_id
 
+MEASUREMENT_ATTRIBUTES = {
+    "state_class": "measurement",
+    "unit_of_measurement": "EUR/kWh",
+}
+
+
+class CustomSensorHub:
+    """Fan out state changes of contract sensors to their alias sensors.
+
+    Each source entity gets a single state listener, however many alias
+    sensors track it.
+    """
+
+    def __init__(self, hass) -> None:
+        """Initialize the hub."""
+        self._hass = hass
+        self._entities = {}
+        self._unsubs = {}
+        self.state_writes = 0
+        self.suppressed_writes = 0
+
+    @callback
+    def async_register(self, entity):
+        """Start dispatching the source of an alias sensor to it."""
+        source = entity.original_sensor_id
+        self._entities.setdefault(source, []).append(entity)
+        if source not in self._unsubs:
+            self._unsubs[source] = async_track_state_change_event(
+                self._hass, source, self._async_state_changed
+            )
+
+    @callback
+    def async_unregister(self, entity):
+        """Stop dispatching to an alias sensor, dropping unused listeners."""
+        source = entity.original_sensor_id
+        entities = self._entities.get(source, [])
+        if entity in entities:
+            entities.remove(entity)
+        if not entities:
+            self._entities.pop(source, None)
+            if (unsub := self._unsubs.pop(source, None)) is not None:
+                unsub()
+
+    @callback
+    def _async_state_changed(self, event):
+        """Handle state changes of a source sensor."""
+        new_state = event.data.get("new_state")
+        if new_state is None:
+            return
+        for entity in self._entities.get(event.data["entity_id"], ()):
+            entity.async_update_from_source(new_state)
+
 
 class CustomSensor(SensorEntity):
     """Representation of a custom sensor that tracks an existing sensor."""
 
-    def __init__(self, hass, custom_sensor_name, original_sensor_id, sensor_type="all"):
+    _attr_should_poll = False
+    _unrecorded_attributes = UNRECORDED_ATTRIBUTES
+
+    def __init__(
+        self, hass, hub, custom_sensor_name, original_sensor_id, sensor_type="all"
+    ):
         self.hass = hass
+        self._hub = hub
         self._custom_sensor_name = custom_sensor_name
         self._original_sensor_id = original_sensor_id
         self._state = None
-        self._attributes = {"icon": "mdi:folder"}
-        self._unsub = None
+        self._attributes = None
+        self._fingerprint = None
+        self._attr_icon = "mdi:folder"
         self._sensor_type = sensor_type
         self._unique_id = f"sensor.{format_id(self._custom_sensor_name)}"
 
         if sensor_type == "afname":
             self._custom_sensor_name += " Afname"
             self._unique_id += "_afname"
+            self._attr_icon = "mdi:folder-arrow-up"
         if sensor_type == "injectie":
             self._custom_sensor_name += " Injectie"
             self._unique_id += "_injectie"
+            self._attr_icon = "mdi:folder-arrow-down"
 
         self.entity_id = self._unique_id
 
+    @property
+    def original_sensor_id(self):
+        """Return the entity id of the tracked sensor."""
+        return self._original_sensor_id
+
     @property
     def name(self):
         """Return the custom sensor name."""
@@ -48,53 +115,39 @@ class CustomSensor(SensorEntity):
         return self._attributes
 
     async def async_added_to_hass(self):
-        """Register callbacks when sensor is added to hass."""
-
-        @callback
-        def state_listener(event):
-            """Handle state changes of the original sensor."""
-            new_state = event.data.get("new_state")
-            if new_state:
-                self._update_values(new_state)
-                self.async_write_ha_state()
-
-        self._unsub = async_track_state_change_event(
-            self.hass, self._original_sensor_id, state_listener
-        )
-
-        await self.async_update()
-
-    async def async_will_remove_from_hass(self):
-        """Remove state listener when entity is removed."""
-        if self._unsub is not None:
-            self._unsub()
-
-    async def async_update(self):
-        """Update the sensor by fetching the state and attributes of the original sensor."""
+        """Register with the hub when sensor is added to hass."""
+        self._hub.async_register(self)
         original_sensor = self.hass.states.get(self._original_sensor_id)
         if original_sensor:
             self._update_values(original_sensor)
+        self._fingerprint = (self._state, self._attributes)
+
+    async def async_will_remove_from_hass(self):
+        """Unregister from the hub when entity is removed."""
+        self._hub.async_unregister(self)
+
+    @callback
+    def async_update_from_source(self, original_sensor):
+        """Update from a new state of the original sensor, writing only changes."""
+        self._update_values(original_sensor)
+        fingerprint = (self._state, self._attributes)
+        if fingerprint == self._fingerprint:
+            self._hub.suppressed_writes += 1
+            return
+        self._fingerprint = fingerprint
+        self._hub.state_writes += 1
+        self.async_write_ha_state()
 
     def _update_values(self, original_sensor):
-        if self._sensor_type == "afname":
-            self._state = original_sensor.attributes.get("prices_afname", {}).get(
-                "current_price", self._state if self._state is not None else 0
-            )
-            self._attributes = {
-                "state_class": "measurement",
-                "unit_of_measurement": "EUR/kWh",
-                "icon": "mdi:folder-arrow-up",
-            }
-        if self._sensor_type == "injectie":
-            self._state = original_sensor.attributes.get("prices_injectie", {}).get(
-                "current_price", self._state if self._state is not None else 0
-            )
-            self._attributes = {
-                "state_class": "measurement",
-                "unit_of_measurement": "EUR/kWh",
-                "icon": "mdi:folder-arrow-down",
-            }
+        """Read only the fields this sensor exposes from the original sensor."""
         if self._sensor_type == "all":
+            # The state machine's read-only attributes are shared, not copied
             self._state = original_sensor.state
-            self._attributes = dict(original_sensor.attributes)
-            self._attributes["icon"] = "mdi:folder"
+            self._attributes = original_sensor.attributes
+            return
+
+        prices = original_sensor.attributes.get(f"prices_{self._sensor_type}") or {}
+        self._state = prices.get(
+            "current_price", self._state if self._state is not None else 0
+        )
+        self._attributes = MEASUREMENT_ATTRIBUTES
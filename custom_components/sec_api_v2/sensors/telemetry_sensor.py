@@ -0,0 +1,98 @@
+"""Diagnostic sensors exposing the integration's runtime telemetry."""
+
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from homeassistant.const import PERCENTAGE, EntityCategory, UnitOfTime
+
+from ..telemetry import hit_ratio
+
+
+def _refresh_duration(data):
+    histogram = data["coordinator"].refreshes.get("refresh")
+    return round(histogram.last, 1) if histogram and histogram.last else None
+
+
+def _mean_latency(data):
+    latency = data["api"].requests.mean_latency()
+    return round(latency, 1) if latency is not None else None
+
+
+def _cache_hit_ratio(data):
+    cache = data["api"].cache
+    ratio = hit_ratio(cache.hits, cache.misses)
+    return round(ratio * 100, 1) if ratio is not None else None
+
+
+def _state_writes(data):
+    hub = data.get("custom_sensor_hub")
+    return data["coordinator"].state_writes + (hub.state_writes if hub else 0)
+
+
+# key, name, unit, state class, value function of the entry data
+TELEMETRY_SENSORS = (
+    (
+        "api_requests",
+        "API requests",
+        None,
+        SensorStateClass.TOTAL_INCREASING,
+        lambda data: data["api"].requests.total,
+    ),
+    (
+        "api_latency",
+        "API latency",
+        UnitOfTime.MILLISECONDS,
+        SensorStateClass.MEASUREMENT,
+        _mean_latency,
+    ),
+    (
+        "cache_hit_ratio",
+        "Cache hit ratio",
+        PERCENTAGE,
+        SensorStateClass.MEASUREMENT,
+        _cache_hit_ratio,
+    ),
+    (
+        "refresh_duration",
+        "Refresh duration",
+        UnitOfTime.MILLISECONDS,
+        SensorStateClass.MEASUREMENT,
+        _refresh_duration,
+    ),
+    (
+        "state_writes",
+        "State writes",
+        None,
+        SensorStateClass.TOTAL_INCREASING,
+        _state_writes,
+    ),
+    (
+        "circuit_breaker",
+        "API circuit breaker",
+        None,
+        None,
+        lambda data: data["api"].breaker.state,
+    ),
+)
+
+
+class TelemetrySensor(SensorEntity):
+    """Diagnostic sensor polling one telemetry value, disabled by default."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_icon = "mdi:chart-box-outline"
+
+    def __init__(
+        self, config_entry, data, key, name, unit, state_class, value_fn
+    ) -> None:
+        """Initialize the sensor on the entry data."""
+        self._data = data
+        self._value_fn = value_fn
+        self._attr_name = f"SEC: {name}"
+        self._attr_unique_id = f"{config_entry.entry_id}_sec_telemetry_{key}"
+        self._attr_native_unit_of_measurement = unit
+        self._attr_state_class = state_class
+
+    @property
+    def native_value(self):
+        """Return the current telemetry value."""
+        return self._value_fn(self._data)
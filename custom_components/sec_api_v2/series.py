@@ -0,0 +1,166 @@
+"""Day-ahead price series of dynamic contracts."""
+
+from array import array
+from datetime import timedelta
+import math
+
+from homeassistant.util import dt as dt_util
+
+
+def _price(value):
+    """Return a slot price as a float, NaN when it is not published."""
+    if value.__class__ is float or value.__class__ is int:
+        return float(value)
+    return math.nan
+
+
+class PriceSeries:
+    """Price curve of one contract as a compact array of slot prices.
+
+    Slots are resolution minutes long, the first one starts at start. Prices
+    are stored as doubles, NaN marks a slot without a published price.
+    start is kept in UTC so slot arithmetic is right on DST days, which have
+    23 or 25 hours of slots; times are converted to local only for display.
+    """
+
+    __slots__ = ("start", "resolution", "values")
+
+    def __init__(self, start, resolution, values) -> None:
+        """Initialize the series."""
+        self.start = start
+        self.resolution = resolution
+        self.values = values
+
+    @classmethod
+    def from_raw(cls, raw):
+        """Build a series from a {start, resolution, values} API dict, if complete."""
+        if not raw:
+            return None
+        start = dt_util.parse_datetime(raw.get("start") or "")
+        resolution = raw.get("resolution")
+        values = raw.get("values")
+        if start is None or not resolution or not values:
+            return None
+        return cls(
+            dt_util.as_utc(start),
+            int(resolution),
+            array("d", (_price(value) for value in values)),
+        )
+
+    @property
+    def step(self):
+        """Return the length of one slot."""
+        return timedelta(minutes=self.resolution)
+
+    @property
+    def end(self):
+        """Return the end of the last slot."""
+        return self.start + len(self.values) * self.step
+
+    def index(self, when):
+        """Return the slot index of a moment, may be out of range."""
+        return (when - self.start) // self.step
+
+    def slot_start(self, index):
+        """Return the start of a slot."""
+        return self.start + index * self.step
+
+    def price_at(self, when):
+        """Return the price of the slot holding a moment, if published."""
+        index = self.index(when)
+        if 0 <= index < len(self.values) and not math.isnan(self.values[index]):
+            return self.values[index]
+        return None
+
+    def slice(self, start=None, end=None):
+        """Return the slots overlapping [start, end) as a new series."""
+        first = 0 if start is None else max(self.index(start), 0)
+        last = len(self.values)
+        if end is not None:
+            last = min(-((self.start - end) // self.step), last)
+        return PriceSeries(
+            self.slot_start(first), self.resolution, self.values[first:max(last, first)]
+        )
+
+    def as_dict(self):
+        """Return the series for a service response."""
+        return {
+            "start": dt_util.as_local(self.start).isoformat(),
+            "resolution": self.resolution,
+            "prices": [None if math.isnan(value) else value for value in self.values],
+        }
+
+    def as_raw(self):
+        """Return the series in the API format, as read by from_raw."""
+        return {
+            "start": self.start.isoformat(),
+            "resolution": self.resolution,
+            "values": [None if math.isnan(value) else value for value in self.values],
+        }
+
+
+def parse_price_series(data):
+    """Return the day-ahead series of a /data series response per price component.
+
+    Every prijsonderdeel carries series_afname and series_injectie dicts with
+    the start of the first slot, the slot length in minutes and the prices.
+    Keys match coordinator.record_key, values are (afname, injectie) pairs.
+    """
+    return {
+        (p.get("handelsnaam"), p.get("productnaam"), p.get("prijsonderdeel")): (
+            PriceSeries.from_raw(p.get("series_afname")),
+            PriceSeries.from_raw(p.get("series_injectie")),
+        )
+        for contract_value in data.get("data", {}).values()
+        for p in contract_value.get("prijsonderdelen", [])
+    }
+
+
+def series_end(pairs):
+    """Return the end of the longest series of a group, if any."""
+    ends = [
+        series.end
+        for pair in pairs.values()
+        for series in pair
+        if series is not None
+    ]
+    return max(ends, default=None)
+
+
+def current_slot(pair, now):
+    """Return the start of the slot holding now of an (afname, injectie) pair."""
+    series = pair[0] or pair[1]
+    if series is None:
+        return None
+    return series.slot_start(series.index(now))
+
+
+def next_slot_change(pair, now):
+    """Return the start of the slot after the one holding now, if in the series."""
+    series = pair[0] or pair[1]
+    if series is None:
+        return None
+    index = max(series.index(now) + 1, 0)
+    if index >= len(series.values):
+        return None
+    return series.slot_start(index)
+
+
+def upcoming_prices(pair, now, count):
+    """Return the prices of the current and next slots, for a state attribute."""
+    afname, injectie = pair
+    series = afname or injectie
+    if series is None:
+        return []
+    first = max(series.index(now), 0)
+    upcoming = []
+    for index in range(first, min(first + count, len(series.values))):
+        start = series.slot_start(index)
+        upcoming.append(
+            {
+                "start": dt_util.as_local(start).isoformat(),
+                "afname": afname.price_at(start) if afname else None,
+                "injectie": injectie.price_at(start) if injectie else None,
+            }
+        )
+    return upcoming
@@ -1,12 +1,43 @@
 """Helper functions."""
 
+import asyncio
+from datetime import timedelta
 import logging
+import math
+from pathlib import Path
 import re
 
-from homeassistant.core import HomeAssistant
+import aiohttp
+import voluptuous as vol
 
-from .const import DOMAIN
-from .db import add_contract, add_custom_sensor, add_top_contract, empty_top_contracts
+from homeassistant.core import HomeAssistant, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.util import dt as dt_util
+
+from .const import CONTRACT_TYPE_DYNAMIC, DOMAIN, SIGNAL_ENTITIES_CHANGED
+from .db import async_get_db
+from .profiler import (
+    PROFILE_FILENAME,
+    PROFILER_CPROFILE,
+    PROFILER_SAMPLING,
+    SORT_KEYS,
+    CProfileRun,
+    MemoryDiff,
+    SamplingRun,
+    async_get_profile_lock,
+)
+from .ranking import DEFAULT_ANNUAL_CONSUMPTION, DEFAULT_METRIC, TopN
+from .simulate import (
+    DEFAULT_PROFILE_SHAPE,
+    NETWORK_FIELDS,
+    PROFILE_SHAPES,
+    LoadProfile,
+    load_csv,
+    simulate,
+)
+from .windows import find_cheapest
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -19,94 +50,547 @@ def format_id(input_str):
     return formatted_str.strip("_").lower()
 
 
+def parse_contract_id(contract_id):
+    """Split a generated contract id into its contract row and sensor id.
+
+    Ids join supplier, contract name, contract type, price component, energy
+    type, segment and optionally month and year with "-_-".
+    """
+    params = [x.replace("--", " ") for x in contract_id.split("-_-")]
+    if len(params) not in (6, 8):
+        raise vol.Invalid(f"Invalid contract id: {contract_id}")
+
+    supplier, contract_name, contract_type, price_component, energy_type, segment = (
+        params[:6]
+    )
+    month, year = params[6:] if len(params) == 8 else (None, None)
+    row = (
+        energy_type,
+        contract_type,
+        segment,
+        supplier,
+        contract_name,
+        price_component,
+        month,
+        year,
+    )
+    name = f"{supplier} {contract_name} {energy_type} {contract_type} {price_component} {segment}"
+    if month is not None:
+        name = f"{name} {month} {year}"
+    return row, f"sensor.sec_{format_id(name)}"
+
+
+GENERATE_CONTRACTS_SCHEMA = vol.Schema(
+    {
+        vol.Required("contracts"): vol.All(
+            cv.ensure_list,
+            [
+                vol.Schema(
+                    {
+                        vol.Required("id"): cv.string,
+                        vol.Required("alias"): cv.string,
+                    },
+                    extra=vol.ALLOW_EXTRA,
+                )
+            ],
+        )
+    }
+)
+
+
 async def async_handle_generate_contracts(hass: HomeAssistant, entry, call):
-    """Handle generate_contracts service."""
-    contracts = call.data.get("contracts", [])
-
-    for contract in contracts:
-        params = contract["id"].split("-_-")
-        params = [x.replace("--", " ") for x in params]
-        date_included = len(params) > 6
-
-        if date_included:
-            add_contract(
-                entry.entry_id,
-                params[4],
-                params[2],
-                params[5],
-                params[0],
-                params[1],
-                params[3],
-                params[6],
-                params[7],
-            )
-        else:
-            add_contract(
-                entry.entry_id,
-                params[4],
-                params[2],
-                params[5],
-                params[0],
-                params[1],
-                params[3],
-            )
+    """Handle generate_contracts service.
 
-        if date_included:
-            contract_name = f"{params[0]} {params[1]} {params[4]} {params[2]} {params[3]} {params[5]} {params[6]} {params[7]}"
+    The whole payload is validated before anything is written, then imported
+    in one transaction and the new sensors are added in one go.
+    """
+    contracts = []
+    aliases = []
+    for contract in call.data.get("contracts", []):
+        try:
+            row, sensor_id = parse_contract_id(contract["id"])
+        except vol.Invalid as err:
+            raise ServiceValidationError(str(err)) from err
+        contracts.append(row)
+        aliases.append((sensor_id, contract["alias"]))
 
-        else:
-            contract_name = f"{params[0]} {params[1]} {params[4]} {params[2]} {params[3]} {params[5]}"
-        contract_id = f"sensor.sec_{format_id(contract_name)}"
+    if not contracts:
+        return
 
-        add_custom_sensor(entry.entry_id, contract_id, contract["alias"])
-        await hass.config_entries.async_reload(entry.entry_id)
+    db = await async_get_db(hass)
+    await db.async_import_contracts(entry.entry_id, contracts, aliases)
+    async_dispatcher_send(hass, SIGNAL_ENTITIES_CHANGED.format(entry.entry_id))
 
 
-async def async_handle_fetch_best_contracts(hass: HomeAssistant, entry, data=None):
-    """Fetch the cheapest contracts at the moment."""
-    api = hass.data.setdefault(DOMAIN, {})[entry.entry_id]
-    if data is not None:
-        energy_type = data.get("conf_top_energy_type", "")
-        segment = data.get("conf_top_segment", "")
-        contract_type = data.get("conf_top_contract_type", "")
-        amount = data.get("conf_top_contracts_limit", "5")
-    else:
-        energy_type = entry.data.get("conf_top_energy_type", "")
-        segment = entry.data.get("conf_top_segment", "")
-        contract_type = entry.data.get("conf_top_contract_type", "")
-        amount = entry.data.get("conf_top_contracts_limit", "3")
-
-    data = await api.get_prijsonderdelen(
-        energietype=energy_type,
-        segment=segment,
-        vast_variabel_dynamisch=contract_type,
-        bottom=amount,
-        postcode=entry.data.get("postcode", "2000"),
-        show_prices="yes",
+GET_CONTRACT_DETAILS_SCHEMA = vol.Schema({vol.Required("entity_id"): cv.entity_ids})
+
+
+async def async_handle_get_contract_details(hass: HomeAssistant, entry, call):
+    """Return the full API record behind contract sensors."""
+    entities = hass.data[DOMAIN][entry.entry_id].get("entities", {})
+    sensors = {
+        entity.entity_id: entity
+        for _, entity in entities.values()
+        if hasattr(entity, "record")
+    }
+
+    details = {}
+    for entity_id in call.data["entity_id"]:
+        if entity_id not in sensors:
+            raise ServiceValidationError(f"{entity_id} is not a contract sensor")
+        record = sensors[entity_id].record
+        details[entity_id] = record.as_dict() if record else None
+    return details
+
+
+GET_PRICE_FORECAST_SCHEMA = vol.Schema(
+    {
+        vol.Required("entity_id"): cv.entity_ids,
+        vol.Optional("start"): cv.datetime,
+        vol.Optional("end"): cv.datetime,
+    }
+)
+
+
+async def async_handle_get_price_forecast(hass: HomeAssistant, entry, call):
+    """Return the cached day-ahead price series behind contract sensors."""
+    entities = hass.data[DOMAIN][entry.entry_id].get("entities", {})
+    sensors = {
+        entity.entity_id: entity
+        for _, entity in entities.values()
+        if hasattr(entity, "series")
+    }
+    start = call.data.get("start")
+    end = call.data.get("end")
+    if start is not None:
+        start = dt_util.as_local(start)
+    if end is not None:
+        end = dt_util.as_local(end)
+
+    forecast = {}
+    for entity_id in call.data["entity_id"]:
+        if entity_id not in sensors:
+            raise ServiceValidationError(f"{entity_id} is not a contract sensor")
+        series = sensors[entity_id].series
+        if series is None:
+            forecast[entity_id] = None
+            continue
+        afname, injectie = series
+        forecast[entity_id] = {
+            "afname": afname.slice(start, end).as_dict() if afname else None,
+            "injectie": injectie.slice(start, end).as_dict() if injectie else None,
+        }
+    return forecast
+
+
+APPLIANCE_FIELDS = {
+    vol.Optional("deadline"): cv.datetime,
+    vol.Optional("power", default=1.0): vol.Any(
+        vol.Coerce(float), vol.All([vol.Coerce(float)], vol.Length(min=1))
+    ),
+    vol.Optional("contiguous", default=True): cv.boolean,
+}
+# At least one slot, a zero duration has no window
+APPLIANCE_DURATION = vol.All(
+    cv.positive_time_period, vol.Range(min=timedelta(0), min_included=False)
+)
+
+
+def _contiguous_profile(appliance):
+    """Reject a power profile for separate slots, it has no slot order to follow."""
+    if isinstance(appliance.get("power"), list) and not appliance.get(
+        "contiguous", True
+    ):
+        raise vol.Invalid("A power profile needs contiguous: true")
+    return appliance
+
+
+FIND_CHEAPEST_WINDOW_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Required("entity_id"): cv.entity_id,
+            vol.Optional("start"): cv.datetime,
+            vol.Optional("duration"): APPLIANCE_DURATION,
+            **APPLIANCE_FIELDS,
+            vol.Optional("appliances"): vol.All(
+                cv.ensure_list,
+                [
+                    vol.All(
+                        vol.Schema(
+                            {
+                                vol.Optional("name"): cv.string,
+                                vol.Required("duration"): APPLIANCE_DURATION,
+                                **APPLIANCE_FIELDS,
+                            }
+                        ),
+                        _contiguous_profile,
+                    )
+                ],
+            ),
+        }
+    ),
+    _contiguous_profile,
+)
+
+
+async def async_handle_find_cheapest_window(hass: HomeAssistant, entry, call):
+    """Return the cheapest slots to run one or more appliances on a dynamic contract.
+
+    Every appliance is searched on the cached offtake price series, either as
+    one contiguous run or as its cheapest separate slots.
+    """
+    entity_id = call.data["entity_id"]
+    entities = hass.data[DOMAIN][entry.entry_id].get("entities", {})
+    sensor = next(
+        (
+            entity
+            for _, entity in entities.values()
+            if entity.entity_id == entity_id and hasattr(entity, "series")
+        ),
+        None,
     )
+    if sensor is None:
+        raise ServiceValidationError(f"{entity_id} is not a contract sensor")
+    series = sensor.series
+    if series is None or series[0] is None:
+        raise ServiceValidationError(
+            f"No price series for {entity_id}, enable price series on a dynamic contract"
+        )
+    afname = series[0]
+
+    if "appliances" in call.data:
+        appliances = call.data["appliances"]
+    elif "duration" in call.data:
+        appliances = [call.data]
+    else:
+        raise ServiceValidationError("Either duration or appliances is required")
+
+    start = dt_util.as_local(call.data.get("start") or dt_util.now())
+    results = []
+    for appliance in appliances:
+        deadline = appliance.get("deadline")
+        slots = math.ceil(appliance["duration"] / afname.step)
+        result = find_cheapest(
+            afname,
+            start,
+            slots,
+            dt_util.as_local(deadline) if deadline is not None else None,
+            appliance["power"],
+            appliance["contiguous"],
+        )
+        results.append({"name": appliance.get("name"), "window": result})
+    return {"resolution": afname.resolution, "appliances": results}
 
-    sorted_data = sorted(
-        data,
-        key=lambda x: x.get("prices_afname", {}).get(
-            "today_avg_anchor_10kwh", float("inf")
+
+SIMULATE_ANNUAL_COST_SCHEMA = vol.Schema(
+    {
+        vol.Optional("energy_type", default="Elektriciteit"): vol.In(
+            ["Elektriciteit", "Gas"]
+        ),
+        vol.Optional("contract_type", default="All"): vol.In(
+            ["Dynamisch", "Variabel", "Vast", "All"]
+        ),
+        vol.Optional("segment", default="Woning"): vol.In(
+            ["Woning", "Onderneming", "All"]
+        ),
+        vol.Exclusive("csv", "profile"): cv.string,
+        vol.Exclusive("annual_consumption", "profile"): vol.All(
+            vol.Coerce(float), vol.Range(min=0)
+        ),
+        vol.Optional("annual_injection", default=0): vol.All(
+            vol.Coerce(float), vol.Range(min=0)
         ),
+        vol.Optional("profile_shape", default=DEFAULT_PROFILE_SHAPE): vol.In(
+            list(PROFILE_SHAPES)
+        ),
+        vol.Optional("constants", default={}): {
+            vol.In(NETWORK_FIELDS): vol.Coerce(float)
+        },
+        vol.Optional("limit"): cv.positive_int,
+    }
+)
+
+
+def _csv_allowed(hass: HomeAssistant, path):
+    """Return whether a CSV is in the config directory or an allowlisted one.
+
+    Paths are resolved on disk, so symlinks and ".." cannot leave them.
+    """
+    config_dir = Path(hass.config.config_dir).resolve()
+    if Path(path).resolve().is_relative_to(config_dir):
+        return True
+    return hass.config.is_allowed_path(path)
+
+
+async def async_handle_simulate_annual_cost(hass: HomeAssistant, entry, call):
+    """Return the yearly cost of every matching contract for a load profile, cheapest first.
+
+    The profile is a CSV of quarter-hour meter readings in the config
+    directory, scaled to a year, or a yearly consumption spread with a
+    profile shape. Network components given in constants replace those of
+    the API; components neither holds are left out and listed as missing.
+    """
+    api = hass.data[DOMAIN][entry.entry_id]["api"]
+    data = call.data
+    if "csv" in data:
+        path = hass.config.path(data["csv"])
+        if not await hass.async_add_executor_job(_csv_allowed, hass, path):
+            raise ServiceValidationError(f"Access to {data['csv']} is not allowed")
+        try:
+            profile = await hass.async_add_executor_job(load_csv, path)
+        except (OSError, ValueError) as err:
+            raise ServiceValidationError(f"Cannot read load profile: {err}") from err
+    elif "annual_consumption" in data:
+        profile = LoadProfile.from_annual(
+            data["annual_consumption"],
+            data["annual_injection"],
+            data["profile_shape"],
+        )
+    else:
+        raise ServiceValidationError("Either csv or annual_consumption is required")
+
+    params = {
+        key: "" if value == "All" else value
+        for key, value in (
+            ("energietype", data["energy_type"]),
+            ("vast_variabel_dynamisch", data["contract_type"]),
+            ("segment", data["segment"]),
+        )
+    }
+    params["postcode"] = entry.data.get("zip_code", "2000")
+    fetches = [
+        api.get_prijsonderdelen(**params, show_prices="yes"),
+        api.get_constants(entry.data.get("zip_code")),
+    ]
+    if params["vast_variabel_dynamisch"] in ("", CONTRACT_TYPE_DYNAMIC):
+        fetches.append(api.get_price_series(**params))
+    records, constants, *series = await asyncio.gather(*fetches)
+    if records is None:
+        raise HomeAssistantError("Failed to fetch contracts")
+
+    ranked, missing = await hass.async_add_executor_job(
+        simulate,
+        records,
+        profile,
+        {**(constants or {}), **data["constants"]},
+        series[0] if series else None,
     )
+    if missing:
+        _LOGGER.warning(
+            "Network components %s are not in the constants, costs exclude them",
+            ", ".join(missing),
+        )
+    return {
+        "annual_consumption": profile.annual_offtake,
+        "covered_days": profile.days,
+        "missing_constants": missing,
+        "contracts": ranked[: data.get("limit")],
+    }
+
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Exclusive("refreshes", "target"): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=50)
+        ),
+        vol.Exclusive("service", "target"): cv.string,
+        vol.Optional("service_data", default={}): dict,
+        vol.Optional("trigger", default=True): cv.boolean,
+        vol.Optional("cached", default=False): cv.boolean,
+        vol.Optional("timeout", default=3600): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=86400)
+        ),
+        vol.Optional("profiler", default=PROFILER_CPROFILE): vol.In(
+            [PROFILER_CPROFILE, PROFILER_SAMPLING]
+        ),
+        vol.Optional("memory", default=False): cv.boolean,
+        vol.Optional("sort", default="self"): vol.In(list(SORT_KEYS)),
+        vol.Optional("integration_only", default=False): cv.boolean,
+        vol.Optional("limit", default=20): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=500)
+        ),
+    }
+)
+
+
+async def _async_wait_for_refreshes(coordinator, count, timeout):
+    """Wait until the coordinator has notified its sensors count times."""
+    done = asyncio.Event()
+    seen = 0
+
+    def _refreshed():
+        nonlocal seen
+        seen += 1
+        if seen >= count:
+            done.set()
 
-    for row in sorted_data:
-        _LOGGER.info(row["productnaam"])
-        _LOGGER.info(row["prices_afname"]["today_avg_anchor_10kwh"])
-        _LOGGER.info("======")
+    remove = coordinator.async_add_listener(_refreshed)
+    try:
+        await asyncio.wait_for(done.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        remove()
+    return seen
+
+
+async def async_handle_profile(hass: HomeAssistant, entry, call):
+    """Profile contract refreshes or one service call and return the hot spots.
+
+    Without a service, refreshes of all tracked groups are run now, or with
+    trigger off the next scheduled ones are awaited up to timeout seconds.
+    Triggered refreshes start from an empty response cache unless cached is
+    set, a fresh cache would answer every request and hide the HTTP, parsing
+    and database work.
+    The profile covers everything the event loop runs meanwhile; stats are
+    written to the config directory.
+    """
+    data = call.data
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    service = data.get("service")
+    if service is not None and (
+        service == "profile" or not hass.services.has_service(DOMAIN, service)
+    ):
+        raise ServiceValidationError(f"{DOMAIN}.{service} cannot be profiled")
+
+    lock = async_get_profile_lock(hass)
+    if lock.locked():
+        raise ServiceValidationError("A profile is already running")
+
+    async with lock:
+        if data["profiler"] == PROFILER_SAMPLING:
+            try:
+                profiler = SamplingRun()
+            except ImportError as err:
+                raise ServiceValidationError(
+                    "The sampling profiler needs pyinstrument"
+                ) from err
+        else:
+            profiler = CProfileRun()
+        memory = MemoryDiff() if data["memory"] else None
+
+        if memory is not None:
+            await hass.async_add_executor_job(memory.start)
+        try:
+            profiler.start()
+        except ValueError as err:
+            # Another profiler, such as the profiler integration, is active
+            if memory is not None:
+                await hass.async_add_executor_job(memory.stop)
+            raise HomeAssistantError(f"Cannot start profiling: {err}") from err
+
+        start = dt_util.utcnow()
+        refreshes = None
+        try:
+            if service is not None:
+                await hass.services.async_call(
+                    DOMAIN,
+                    service,
+                    data["service_data"],
+                    blocking=True,
+                    return_response=hass.services.supports_response(DOMAIN, service)
+                    != SupportsResponse.NONE,
+                )
+            elif data["trigger"]:
+                refreshes = data.get("refreshes", 1)
+                api = hass.data[DOMAIN][entry.entry_id]["api"]
+                for _ in range(refreshes):
+                    if not data["cached"]:
+                        api.cache.clear()
+                    await coordinator.async_refresh_groups(coordinator.groups)
+            else:
+                refreshes = await _async_wait_for_refreshes(
+                    coordinator, data.get("refreshes", 1), data["timeout"]
+                )
+        finally:
+            profiler.stop()
+            duration = (dt_util.utcnow() - start).total_seconds()
+            if memory is not None:
+                await hass.async_add_executor_job(memory.stop)
+
+        path = hass.config.path(
+            PROFILE_FILENAME.format(start.strftime("%Y%m%d%H%M%S%f"), profiler.suffix)
+        )
+        await hass.async_add_executor_job(profiler.save, path)
+        functions = await hass.async_add_executor_job(
+            profiler.top, data["sort"], data["limit"], data["integration_only"]
+        )
+        response = {
+            "file": path,
+            "profiler": profiler.name,
+            "duration": round(duration, 3),
+            "functions": functions,
+        }
+        if service is not None:
+            response["service"] = f"{DOMAIN}.{service}"
+        else:
+            response["refreshes"] = refreshes
+        if memory is not None:
+            response["memory"] = await hass.async_add_executor_job(
+                memory.top, data["limit"], data["integration_only"]
+            )
+        _LOGGER.info("Wrote profile of %.1f s to %s", duration, path)
+        return response
+
+
+async def async_handle_fetch_best_contracts(hass: HomeAssistant, entry, data=None):
+    """Fetch the best contracts at the moment by the configured metric."""
+    api = hass.data.setdefault(DOMAIN, {})[entry.entry_id]["api"]
+    if data is None:
+        data = entry.data
+    energy_type = data.get("conf_top_energy_type", "")
+    segment = data.get("conf_top_segment", "")
+    contract_type = data.get("conf_top_contract_type", "")
+    amount = int(data.get("conf_top_contracts_limit", 3))
+    if amount < 1:
+        # Entries configured before the limit was validated
+        _LOGGER.error("Invalid number of top contracts: %s", amount)
+        return
+    metric = data.get("conf_top_metric", DEFAULT_METRIC)
+
+    params = {
+        "energietype": energy_type,
+        "segment": segment,
+        "vast_variabel_dynamisch": contract_type,
+        "postcode": entry.data.get("postcode", "2000"),
+        "show_prices": "yes",
+    }
+    if metric == DEFAULT_METRIC:
+        # The server side cut-off only matches the default metric
+        params["bottom"] = amount
+
+    metric_args = {}
+    if metric == "annual_cost":
+        metric_args["annual_consumption"] = data.get(
+            "conf_top_annual_consumption", DEFAULT_ANNUAL_CONSUMPTION
+        )
+    ranking = TopN(amount, metric, **metric_args)
+
+    # "All" queries are large, rank them while they stream in
+    try:
+        async for record in api.iter_prijsonderdelen(**params):
+            ranking.push(record)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as err:
+        _LOGGER.error("Error fetching top contracts: %r", err)
+        return
+    sorted_data = ranking.result()
+    _LOGGER.debug(
+        "Ranked %s top contracts by %s, %s without the metric",
+        len(sorted_data),
+        metric,
+        ranking.missing_count,
+    )
 
-    empty_top_contracts()
+    db = await async_get_db(hass)
+    await db.async_empty_top_contracts()
     for i, row in enumerate(sorted_data):
-        _LOGGER.info(f"Adding top contract {i}")
-        add_top_contract(
+        await db.async_add_top_contract(
             i + 1,
             entry.entry_id,
-            row["energietype"],
-            row["vast_variabel_dynamisch"],
-            row["segment"],
-            row["handelsnaam"],
-            row["productnaam"],
-            row["prijsonderdeel"],
+            row.energietype,
+            row.vast_variabel_dynamisch,
+            row.segment,
+            row.handelsnaam,
+            row.productnaam,
+            row.prijsonderdeel,
         )
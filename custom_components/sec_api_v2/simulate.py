@@ -0,0 +1,292 @@
+"""Annual cost simulation of contracts from a load profile."""
+
+import csv
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+
+import numpy as np
+
+from homeassistant.util import dt as dt_util
+
+from .const import CONTRACT_TYPE_DYNAMIC
+
+SLOTS_PER_DAY = 96
+SLOT_MINUTES = 15
+# Capacity tariff is charged on the monthly peak, with a minimum peak in kW
+MIN_MONTHLY_PEAK = 2.5
+
+# Network tariff and tax components looked up in the /constants response.
+# The response is shown as is by the constant sensor; components it does not
+# carry under these names are reported as missing, or given by the caller.
+NETWORK_KWH_FIELDS = (
+    "distributie_kwh",
+    "transmissie_kwh",
+    "accijnzen_kwh",
+    "energiebijdrage_kwh",
+    "groene_stroom_kwh",
+    "wkk_kwh",
+)
+NETWORK_CAPACITY_FIELD = "capaciteitstarief"
+NETWORK_FIXED_FIELD = "databeheer"
+NETWORK_FIELDS = (*NETWORK_KWH_FIELDS, NETWORK_CAPACITY_FIELD, NETWORK_FIXED_FIELD)
+# Yearly fixed fee of a contract, when the /data record carries one
+FIXED_FEE_FIELD = "vaste_vergoeding"
+
+# Relative hourly consumption over a day, for profiles built from a yearly figure
+# fmt: off
+PROFILE_SHAPES = {
+    "flat": (1.0,) * 24,
+    "residential": (
+        0.55, 0.45, 0.40, 0.38, 0.38, 0.45, 0.75, 1.05,
+        1.00, 0.85, 0.80, 0.80, 0.85, 0.80, 0.75, 0.80,
+        0.95, 1.30, 1.70, 1.80, 1.60, 1.35, 1.05, 0.75,
+    ),
+}
+# fmt: on
+DEFAULT_PROFILE_SHAPE = "residential"
+DAYS_PER_YEAR = 365
+
+
+class LoadProfile:
+    """Yearly consumption folded onto the 96 quarter-hours of a day.
+
+    Prices repeat daily, so a year of readings only has to be summed per
+    quarter-hour of the day before it meets the price matrix. days is the
+    period the readings covered, None for a profile built from yearly figures.
+    """
+
+    __slots__ = ("offtake", "injection", "monthly_peaks", "days")
+
+    def __init__(self, offtake, injection, monthly_peaks=None, days=None) -> None:
+        """Initialize the profile from per quarter-hour kWh arrays."""
+        self.offtake = offtake
+        self.injection = injection
+        self.monthly_peaks = monthly_peaks
+        self.days = days
+
+    @classmethod
+    def from_readings(cls, slots, months, offtake, injection):
+        """Fold quarter-hour meter readings in kWh into a yearly profile.
+
+        Readings covering more or less than a year are scaled to 365 days.
+        """
+        peaks = np.zeros(12)
+        np.maximum.at(peaks, months, offtake * (60 / SLOT_MINUTES))
+        days = len(offtake) / SLOTS_PER_DAY
+        scale = DAYS_PER_YEAR / days
+        return cls(
+            np.bincount(slots, weights=offtake, minlength=SLOTS_PER_DAY) * scale,
+            np.bincount(slots, weights=injection, minlength=SLOTS_PER_DAY) * scale,
+            peaks[np.unique(months)],
+            days,
+        )
+
+    @classmethod
+    def from_annual(cls, offtake, injection=0, shape=DEFAULT_PROFILE_SHAPE):
+        """Spread yearly kWh figures over a day with a named shape."""
+        weights = np.repeat(np.asarray(PROFILE_SHAPES[shape], dtype=float), 4)
+        weights /= weights.sum()
+        # Injection is assumed to follow the sun, spread over 9:00-17:00
+        solar = np.zeros(SLOTS_PER_DAY)
+        solar[36:68] = 1 / 32
+        return cls(weights * offtake, solar * injection)
+
+    @property
+    def annual_offtake(self):
+        """Return the yearly offtake in kWh."""
+        return float(self.offtake.sum())
+
+
+def load_csv(path):
+    """Read a CSV of quarter-hour meter readings into a LoadProfile.
+
+    Rows hold a timestamp, the offtake in kWh and optionally the injection
+    in kWh, separated by commas or semicolons. A header row is skipped.
+    """
+    slots = []
+    months = []
+    offtake = []
+    injection = []
+    with open(path, newline="", encoding="utf-8") as file:
+        sample = file.readline()
+        file.seek(0)
+        delimiter = ";" if ";" in sample else ","
+        for row in csv.reader(file, delimiter=delimiter):
+            if len(row) < 2:
+                continue
+            try:
+                moment = datetime.fromisoformat(row[0].strip())
+                used = float(row[1].replace(",", ".") or 0)
+                injected = (
+                    float(row[2].replace(",", ".") or 0) if len(row) > 2 else 0.0
+                )
+            except ValueError:
+                continue
+            slots.append(moment.hour * 4 + moment.minute // SLOT_MINUTES)
+            months.append(moment.month - 1)
+            offtake.append(used)
+            injection.append(injected)
+
+    if not offtake:
+        raise ValueError(f"No meter readings found in {path}")
+    return LoadProfile.from_readings(
+        np.asarray(slots),
+        np.asarray(months),
+        np.asarray(offtake),
+        np.asarray(injection),
+    )
+
+
+def _number(value):
+    """Return a numeric API value as a float, else None."""
+    if value.__class__ is float or value.__class__ is int:
+        return float(value)
+    return None
+
+
+def _scalar_price(prices, *keys):
+    """Return the first numeric price of a price dict, else NaN."""
+    for key in keys:
+        value = (prices or {}).get(key)
+        if value.__class__ is float or value.__class__ is int:
+            return float(value)
+    return np.nan
+
+
+@lru_cache(maxsize=16)
+def _wall_clock_indexes(start, resolution):
+    """Return the slot of every local quarter-hour of the first full day of a series.
+
+    The day is sampled by wall clock, so a DST day with 92 or 100 quarter-hours
+    still maps onto the 96 of the load profile: the skipped hour takes the
+    prices after the change, the repeated hour its first occurrence.
+    """
+    local = dt_util.as_local(start)
+    day = local.date()
+    if local.timetz().replace(tzinfo=None) != time(0):
+        day += timedelta(days=1)
+    step = timedelta(minutes=resolution)
+    indexes = []
+    for slot in range(SLOTS_PER_DAY):
+        wall = datetime.combine(
+            day, time(slot // 4, slot % 4 * SLOT_MINUTES), tzinfo=local.tzinfo
+        )
+        indexes.append((dt_util.as_utc(wall) - start) // step)
+    return np.asarray(indexes)
+
+
+def _day_curve(series):
+    """Return the first full local day of a PriceSeries as 96 quarter-hour prices.
+
+    None when that day is not completely published.
+    """
+    if series is None:
+        return None
+    indexes = _wall_clock_indexes(series.start, series.resolution)
+    if indexes[-1] >= len(series.values):
+        return None
+    curve = np.frombuffer(series.values, dtype=float)[indexes]
+    if np.isnan(curve).any():
+        return None
+    return curve
+
+
+def price_matrix(records, series=None):
+    """Return offtake and injection prices per contract and quarter-hour, and fixed fees.
+
+    Dynamic contracts use their day-ahead curve when one is given, every
+    other contract its current price in all 96 slots. Fixed fees a record
+    does not carry are NaN.
+    """
+    offtake = np.empty((len(records), 1))
+    injection = np.empty((len(records), 1))
+    offtake[:, 0] = [
+        _scalar_price(r.prices_afname, "current_price", "today_avg_anchor_10kwh")
+        for r in records
+    ]
+    injection[:, 0] = [
+        _scalar_price(r.prices_injectie, "current_price") for r in records
+    ]
+    offtake = np.repeat(offtake, SLOTS_PER_DAY, axis=1)
+    injection = np.repeat(np.nan_to_num(injection), SLOTS_PER_DAY, axis=1)
+    fixed = np.fromiter(
+        (_number(r.get(FIXED_FEE_FIELD)) for r in records), float, len(records)
+    )
+
+    if series:
+        for i, r in enumerate(records):
+            if r.vast_variabel_dynamisch != CONTRACT_TYPE_DYNAMIC:
+                continue
+            pair = series.get((r.handelsnaam, r.productnaam, r.prijsonderdeel))
+            if pair is None:
+                continue
+            curve = _day_curve(pair[0])
+            if curve is not None:
+                offtake[i] = curve
+            curve = _day_curve(pair[1])
+            if curve is not None:
+                injection[i] = curve
+    return offtake, injection, fixed
+
+
+def network_cost(constants, profile):
+    """Return the yearly network and tax cost of a profile, equal for every contract.
+
+    Also returns the components constants does not hold a number for, they
+    are left out of the cost.
+    """
+    constants = constants or {}
+    values = {field: _number(constants.get(field)) for field in NETWORK_FIELDS}
+    missing = [field for field, value in values.items() if value is None]
+    values = {field: value or 0.0 for field, value in values.items()}
+
+    per_kwh = sum(values[field] for field in NETWORK_KWH_FIELDS)
+    peaks = profile.monthly_peaks
+    peak = (
+        float(np.maximum(peaks, MIN_MONTHLY_PEAK).mean())
+        if peaks is not None and len(peaks)
+        else MIN_MONTHLY_PEAK
+    )
+    cost = (
+        per_kwh * profile.annual_offtake
+        + values[NETWORK_FIXED_FIELD]
+        + peak * values[NETWORK_CAPACITY_FIELD]
+    )
+    return cost, missing
+
+
+def simulate(records, profile, constants=None, series=None):
+    """Return the yearly cost of every contract for a profile, cheapest first.
+
+    All contracts are priced in one matrix product over the quarter-hours of
+    a day. Costs are in the unit of the API prices; contracts without an
+    offtake price are left out. Also returns the network components missing
+    from constants; a contract without a fixed fee has fixed None.
+    """
+    network, missing = network_cost(constants, profile)
+    if not records:
+        return [], missing
+    offtake, injection, fixed = price_matrix(records, series)
+    energy = offtake @ profile.offtake
+    revenue = injection @ profile.injection
+    total = energy - revenue + np.nan_to_num(fixed) + network
+
+    ranked = []
+    for i in np.argsort(total, kind="stable"):
+        if np.isnan(total[i]):
+            continue
+        record = records[i]
+        ranked.append(
+            {
+                "handelsnaam": record.handelsnaam,
+                "productnaam": record.productnaam,
+                "prijsonderdeel": record.prijsonderdeel,
+                "vast_variabel_dynamisch": record.vast_variabel_dynamisch,
+                "energy": float(energy[i]),
+                "injection": float(revenue[i]),
+                "fixed": None if np.isnan(fixed[i]) else float(fixed[i]),
+                "network": network,
+                "total": float(total[i]),
+            }
+        )
+    return ranked, missing
@@ -0,0 +1,63 @@
+"""Persistent snapshot of the last good API data of a config entry."""
+
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_KEY = f"{DOMAIN}.{{}}.snapshot"
+SNAPSHOT_SAVE_DELAY = 30
+
+
+class SecSnapshot:
+    """Sections of API data saved to .storage for a warm, offline start.
+
+    Every section has an encoder that is only called when the snapshot is
+    written, so frequent refreshes are collapsed into one delayed write.
+    Sections that were restored but are no longer tracked are kept as is.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id) -> None:
+        """Initialize the snapshot."""
+        self._store = Store(
+            hass, SNAPSHOT_VERSION, SNAPSHOT_KEY.format(entry_id), private=True
+        )
+        self._encoders = {}
+        self.restored = {}
+
+    async def async_load(self):
+        """Load the snapshot from disk, return whether there was one."""
+        try:
+            data = await self._store.async_load()
+        except ValueError as err:
+            # A corrupt snapshot only costs a cold start
+            _LOGGER.warning("Ignoring unreadable snapshot: %s", err)
+            data = None
+        self.restored = data or {}
+        return data is not None
+
+    @callback
+    def async_track(self, section, encoder):
+        """Save a section with encoder from now on."""
+        self._encoders[section] = encoder
+
+    @callback
+    def async_schedule_save(self):
+        """Write the snapshot after a short delay."""
+        self._store.async_delay_save(self._data_to_save, SNAPSHOT_SAVE_DELAY)
+
+    async def async_remove(self):
+        """Delete the snapshot file."""
+        await self._store.async_remove()
+
+    def _data_to_save(self):
+        """Encode all sections."""
+        return {
+            **self.restored,
+            **{section: encoder() for section, encoder in self._encoders.items()},
+        }
@@ -0,0 +1,64 @@
+"""Incremental parsing of /data response bodies."""
+
+import codecs
+import json
+import re
+
+_ARRAY_START = re.compile(r'"prijsonderdelen"\s*:\s*\[')
+_SEPARATORS = re.compile(r"[\s,]*")
+# Enough to hold a "prijsonderdelen": [ key split over two chunks
+_KEY_TAIL = 64
+
+
+class PrijsonderdelenParser:
+    """Extract the prijsonderdelen records from a /data body fed in chunks.
+
+    Only the record being decoded is buffered, the surrounding document is
+    skipped, so memory stays bounded by the largest single record.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the parser."""
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._in_array = False
+
+    def feed(self, chunk: bytes) -> list[dict]:
+        """Consume a chunk of the body and return the records it completed."""
+        buffer = self._buffer + self._text.decode(chunk)
+        records = []
+        pos = 0
+        while True:
+            if not self._in_array:
+                match = _ARRAY_START.search(buffer, pos)
+                if match is None:
+                    pos = max(pos, len(buffer) - _KEY_TAIL)
+                    break
+                pos = match.end()
+                self._in_array = True
+
+            pos = _SEPARATORS.match(buffer, pos).end()
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == "]":
+                self._in_array = False
+                pos += 1
+                continue
+
+            try:
+                record, pos_end = self._decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Record not complete yet, wait for the next chunk
+                break
+            records.append(record)
+            pos = pos_end
+
+        self._buffer = buffer[pos:]
+        return records
+
+    def close(self) -> None:
+        """Check the body did not end inside a prijsonderdelen array."""
+        self._text.decode(b"", final=True)
+        if self._in_array:
+            raise ValueError("Truncated prijsonderdelen array in /data response")
@@ -0,0 +1,134 @@
+"""Runtime counters and latency histograms for diagnostics."""
+
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+import time
+
+# Upper bounds in milliseconds, the last bucket holds everything slower
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    """Count of observations per latency bucket, with their sum and maximum."""
+
+    __slots__ = ("counts", "count", "total", "max", "last")
+
+    def __init__(self) -> None:
+        """Initialize an empty histogram."""
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = None
+
+    def observe(self, value):
+        """Add an observation in milliseconds."""
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.last = value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self):
+        """Return the mean observation, if any."""
+        return self.total / self.count if self.count else None
+
+    def as_dict(self):
+        """Return the histogram for diagnostics."""
+        labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS] + ["slower"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.mean, 2) if self.count else None,
+            "max_ms": round(self.max, 2),
+            "last_ms": round(self.last, 2) if self.last is not None else None,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class Timings:
+    """Latency histograms per operation name."""
+
+    def __init__(self) -> None:
+        """Initialize without operations."""
+        self._histograms: dict[str, Histogram] = {}
+
+    def observe(self, name, milliseconds):
+        """Add an observation for an operation."""
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = self._histograms[name] = Histogram()
+        histogram.observe(milliseconds)
+
+    @contextmanager
+    def measure(self, name):
+        """Time the body of a with block as an operation."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    def get(self, name):
+        """Return the histogram of an operation, if observed."""
+        return self._histograms.get(name)
+
+    def as_dict(self):
+        """Return all histograms for diagnostics."""
+        return {
+            name: histogram.as_dict()
+            for name, histogram in sorted(self._histograms.items())
+        }
+
+
+class RequestStats:
+    """Request counts, statuses, latencies and payload sizes per endpoint."""
+
+    def __init__(self) -> None:
+        """Initialize without requests."""
+        self.latency = Timings()
+        self.statuses: dict[str, Counter] = {}
+        self.bytes = Counter()
+
+    def record(self, endpoint, status, milliseconds, size=None):
+        """Record one request attempt; status is the HTTP status or an error name."""
+        self.latency.observe(endpoint, milliseconds)
+        self.statuses.setdefault(endpoint, Counter())[str(status)] += 1
+        if size:
+            self.bytes[endpoint] += size
+
+    @property
+    def total(self):
+        """Return the number of request attempts."""
+        return sum(sum(statuses.values()) for statuses in self.statuses.values())
+
+    def mean_latency(self):
+        """Return the mean latency over all endpoints, if any."""
+        count = 0
+        total = 0.0
+        for endpoint in self.statuses:
+            histogram = self.latency.get(endpoint)
+            count += histogram.count
+            total += histogram.total
+        return total / count if count else None
+
+    def as_dict(self):
+        """Return the stats per endpoint for diagnostics."""
+        latency = self.latency.as_dict()
+        return {
+            endpoint: {
+                "requests": sum(statuses.values()),
+                "statuses": dict(statuses),
+                "bytes": self.bytes[endpoint],
+                "latency": latency.get(endpoint),
+            }
+            for endpoint, statuses in sorted(self.statuses.items())
+        }
+
+
+def hit_ratio(hits, misses):
+    """Return hits / lookups, if there were any."""
+    lookups = hits + misses
+    return hits / lookups if lookups else None
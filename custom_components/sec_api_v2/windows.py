@@ -0,0 +1,126 @@
+"""Cheapest slot search over a day-ahead price series."""
+
+import heapq
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from homeassistant.util import dt as dt_util
+
+
+def _local(when):
+    """Return a slot time as a local ISO string."""
+    return dt_util.as_local(when).isoformat()
+
+
+def cheapest_window(prices, length):
+    """Return (first index, price sum) of the cheapest run of length slots.
+
+    A running sum slides over the prices, so the search is O(n). Runs with
+    an unpublished (NaN) slot are skipped, ties go to the earliest run.
+    """
+    if length <= 0 or length > len(prices):
+        return None
+    best = None
+    total = 0.0
+    missing = 0
+    for i, price in enumerate(prices):
+        if math.isnan(price):
+            missing += 1
+        else:
+            total += price
+        if i >= length:
+            dropped = prices[i - length]
+            if math.isnan(dropped):
+                missing -= 1
+            else:
+                total -= dropped
+        if i >= length - 1 and not missing and (best is None or total < best[1]):
+            best = (i - length + 1, total)
+    return best
+
+
+def cheapest_profile_window(prices, weights):
+    """Return (first index, weighted sum) of the cheapest run for a power profile.
+
+    weights holds the power drawn in each slot of the run. Every run is a
+    row of a strided view on the prices, so all weighted sums come from one
+    matrix-vector product instead of a Python loop per run. Runs with an
+    unpublished slot are skipped, ties go to the earliest run.
+    """
+    length = len(weights)
+    if length == 0 or length > len(prices):
+        return None
+    costs = sliding_window_view(np.asarray(prices), length) @ np.asarray(weights)
+    if np.isnan(costs).all():
+        return None
+    start = int(np.nanargmin(costs))
+    return start, float(costs[start])
+
+
+def cheapest_slots(prices, count):
+    """Return the indexes of the count cheapest published slots, in time order."""
+    published = ((price, i) for i, price in enumerate(prices) if not math.isnan(price))
+    cheapest = heapq.nsmallest(count, published)
+    if len(cheapest) < count:
+        return None
+    return sorted(i for _, i in cheapest)
+
+
+def find_cheapest(series, start, slots, deadline=None, power=1.0, contiguous=True):
+    """Find the cheapest slots of a PriceSeries for one appliance.
+
+    Slots are searched from the slot holding start up to the last slot that
+    ends by deadline. power is the draw in kW, either constant or one value
+    per slot of the run, the latter only for a contiguous run. Returns None
+    when the slots do not fit.
+    """
+    if not contiguous and isinstance(power, list):
+        raise ValueError("A power profile needs a contiguous run")
+    first = max(series.index(start), 0)
+    last = len(series.values)
+    if deadline is not None:
+        last = min(series.index(deadline), last)
+    if slots < 1 or last <= first:
+        return None
+    prices = series.values[first:last]
+    hours = series.resolution / 60
+
+    if not contiguous:
+        indexes = cheapest_slots(prices, slots)
+        if indexes is None:
+            return None
+        energy = power * hours
+        price_sum = sum(prices[i] for i in indexes)
+        return {
+            "slots": [_local(series.slot_start(first + i)) for i in indexes],
+            "average_price": price_sum / slots,
+            "cost": price_sum * energy,
+        }
+
+    if isinstance(power, list):
+        # Pad or cut the profile to the requested run
+        weights = (power + power[-1:] * slots)[:slots]
+        best = cheapest_profile_window(prices, weights)
+        if best is None:
+            return None
+        index, weighted = best
+        cost = weighted * hours
+        average_price = sum(prices[index : index + slots]) / slots
+    else:
+        best = cheapest_window(prices, slots)
+        if best is None:
+            return None
+        index = best[0]
+        # Summed again, the running sum drifts over long series
+        price_sum = sum(prices[index : index + slots])
+        cost = price_sum * power * hours
+        average_price = price_sum / slots
+
+    return {
+        "start": _local(series.slot_start(first + index)),
+        "end": _local(series.slot_start(first + index + slots)),
+        "average_price": average_price,
+        "cost": cost,
+    }